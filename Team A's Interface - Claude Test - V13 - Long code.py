@@ -1,611 +1,2138 @@
-import pygame
-import sys
-import json
-from datetime import datetime
-import random
-
-pygame.init()
-
-# Set up the display
-WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("The Oregon Trail")
-
-# Colors
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-BLUE = (0, 123, 255)
-LIGHT_BLUE = (173, 216, 230)
-RED = (255, 0, 0)
-GREEN = (0, 255, 0)
-DARK_GREEN = (0, 100, 0)
-PRAIRIE_GREEN = (76, 187, 23)
-SKY_BLUE = (135, 206, 235)
-WAGON_BROWN = (139, 69, 19)
-RIVER_BLUE = (65, 105, 225)
-MOUNTAIN_GRAY = (105, 105, 105)
-YELLOW = (255, 255, 0)
-
-# Fonts
-title_font = pygame.font.Font(None, 64)
-button_font = pygame.font.Font(None, 36)
-small_font = pygame.font.Font(None, 24)
-
-# Game states
-MAIN_MENU, CHARACTER_CREATION, CLASS_SELECTION, DIFFICULTY_SELECTION, TRAVEL, SHOP, HIGH_SCORES, VICTORY_SCREEN, DEFEAT_SCREEN, DEATH_SCREEN, RIVER_CROSSING, INVENTORY, CHARACTER_PROGRESS, PROGRESS_MAP, HUNTING = range(15)
-current_state = MAIN_MENU
-
-# Button class
-class Button:
-    def __init__(self, x, y, width, height, text, color, text_color=WHITE, font=button_font):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.text = text
-        self.color = color
-        self.text_color = text_color
-        self.font = font
-        self.tooltip = None
-
-    def draw(self, surface):
-        pygame.draw.rect(surface, self.color, self.rect)
-        pygame.draw.rect(surface, BLACK, self.rect, 2)  # Add a border
-        text_surf = self.font.render(self.text, True, self.text_color)
-        text_rect = text_surf.get_rect(center=self.rect.center)
-        surface.blit(text_surf, text_rect)
-
-    def is_clicked(self, pos):
-        return self.rect.collidepoint(pos)
-
-# Input box class
-class InputBox:
-    def __init__(self, x, y, width, height, text=''):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.color = BLACK
-        self.text = text
-        self.active = False
-
-    def handle_event(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            self.active = self.rect.collidepoint(event.pos)
-        if event.type == pygame.KEYDOWN:
-            if self.active:
-                if event.key == pygame.K_RETURN:
-                    print(self.text)
-                    self.text = ''
-                elif event.key == pygame.K_BACKSPACE:
-                    self.text = self.text[:-1]
-                else:
-                    self.text += event.unicode
-
-    def draw(self, surface):
-        pygame.draw.rect(surface, self.color, self.rect, 2)
-        text_surface = small_font.render(self.text, True, self.color)
-        surface.blit(text_surface, (self.rect.x + 5, self.rect.y + 5))
-
-# Log Display class with scrollbar
-class LogDisplay:
-    def __init__(self, x, y, width, height):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.logs = []
-        self.max_logs = 5
-        self.scroll_y = 0
-        self.scroll_speed = 10
-
-    def add_log(self, message):
-        self.logs.append(message)
-        if len(self.logs) > self.max_logs:
-            self.logs.pop(0)
-        self.scroll_y = max(0, len(self.logs) - self.max_logs)
-
-    def handle_scroll(self, direction):
-        if direction == 'UP':
-            self.scroll_y = max(0, self.scroll_y - self.scroll_speed)
-        elif direction == 'DOWN':
-            self.scroll_y = min(max(0, len(self.logs) - self.max_logs), self.scroll_y + self.scroll_speed)
-
-    def draw(self, surface):
-        pygame.draw.rect(surface, WHITE, self.rect)
-        pygame.draw.rect(surface, BLACK, self.rect, 2)
-        visible_logs = self.logs[self.scroll_y:self.scroll_y + self.max_logs]
-        for i, log in enumerate(visible_logs):
-            log_surf = small_font.render(log, True, BLACK)
-            surface.blit(log_surf, (self.rect.x + 5, self.rect.y + 5 + i * 20))
-
-# Tooltip class
-class Tooltip:
-    def __init__(self, text, font=small_font):
-        self.text = text
-        self.font = font
-        self.surface = font.render(text, True, BLACK)
-        self.rect = self.surface.get_rect()
-
-    def draw(self, screen, pos):
-        self.rect.topleft = pos
-        pygame.draw.rect(screen, LIGHT_BLUE, self.rect.inflate(10, 10))
-        pygame.draw.rect(screen, BLACK, self.rect.inflate(10, 10), 2)
-        screen.blit(self.surface, self.rect)
-
-# Interactive Map class
-class InteractiveMap:
-    def __init__(self, width, height):
-        self.width = width
-        self.height = height
-        self.surface = pygame.Surface((510, 380))
-        self.routes = {
-            "INDEPENDENCE (START)": (40, 350),
-            "FORT KEARNEY": (100, 320),
-            "CHIMNEY ROCK": (160, 290),
-            "LARAMIE": (220, 260),
-            "INDEPENDENCE ROCK": (280, 230),
-            "SOUTH PASS": (340, 200),
-            "FORT BRIDGER": (390, 170),
-            "SODA SPRINGS": (430, 140),
-            "FORT HALL": (460, 110),
-            "FORT BOISE": (480, 80),
-            "BLUE MOUNTAINS": (490, 50),
-            "FORT WALLA WALLA": (490, 20),
-            "THE DALLES": (480, 10),
-            "OREGON CITY (FINISH)": (470, 5),
-        }
-        self.progress = 0
-        self.reached_locations = set()
-
-    def draw(self):
-        self.surface.fill(WHITE)  # White background
-        
-        # Draw the trail
-        route_points = list(self.routes.values())
-        if len(route_points) >= 2:
-            pygame.draw.lines(self.surface, RED, False, route_points, 3)
-        
-        # Draw progress
-        if self.progress > 0:
-            progress_points = route_points[:int(self.progress * len(route_points)) + 1]
-            if len(progress_points) >= 2:
-                pygame.draw.lines(self.surface, GREEN, False, progress_points, 5)
-        
-        # Draw location markers
-        for i, (location, pos) in enumerate(self.routes.items()):
-            color = GREEN if location in self.reached_locations else BLUE
-            pygame.draw.circle(self.surface, color, pos, 5)
-            font = pygame.font.Font(None, 15)
-            text = font.render(location, True, BLACK)
-            text_rect = text.get_rect(center=(pos[0], pos[1] - 10))
-            self.surface.blit(text, text_rect)
-
-    def update_progress(self, progress):
-        self.progress = progress
-        self.reached_locations = set(list(self.routes.keys())[:int(progress * len(self.routes)) + 1])
-
-    def get_surface(self):
-        return self.surface
-
-# Game state
-class GameState:
-    def __init__(self):
-        self.character_name = ""
-        self.character_class = ""
-        self.difficulty = ""
-        self.inventory = {}
-        self.progress = 0
-        self.health = 100
-        self.money = 1000
-        self.total_distance = 2000  # Total distance of the Oregon Trail
-        self.interactive_map = InteractiveMap(400, 300)
-        self.current_location_index = 0
-        self.locations = list(self.interactive_map.routes.keys())
-        
-    def update_progress(self):
-        if self.current_location_index < len(self.locations) - 1:
-            self.current_location_index += 1
-            self.progress = (self.current_location_index / (len(self.locations) - 1)) * 100
-            self.interactive_map.update_progress(self.current_location_index / (len(self.locations) - 1))
-            return True
-        return False
-
-    def get_current_location(self):
-        return self.locations[self.current_location_index]
-
-    def get_progress_percentage(self):
-        return self.progress
-
-    def save_game(self):
-        data = {
-            "character_name": self.character_name,
-            "character_class": self.character_class,
-            "difficulty": self.difficulty,
-            "inventory": self.inventory,
-            "progress": self.progress,
-            "health": self.health,
-            "money": self.money,
-            "date": str(datetime.now())
-        }
-        with open("savegame.json", "w") as f:
-            json.dump(data, f)
-
-    def load_game(self):
-        try:
-            with open("savegame.json", "r") as f:
-                data = json.load(f)
-            self.character_name = data["character_name"]
-            self.character_class = data["character_class"]
-            self.difficulty = data["difficulty"]
-            self.inventory = data["inventory"]
-            self.progress = data["progress"]
-            self.health = data["health"]
-            self.money = data["money"]
-            self.interactive_map.update_progress(self.progress / 100)
-            return True
-        except FileNotFoundError:
-            return False
-
-game_state = GameState()
-log_display = LogDisplay(270, 500, 510, 280)
-
-# Create buttons
-new_game_btn = Button(300, 150, 200, 50, "NEW GAME", BLUE)
-continue_btn = Button(300, 220, 200, 50, "CONTINUE", BLUE)
-settings_btn = Button(300, 290, 200, 50, "SETTINGS", BLUE)
-back_btn = Button(50, 450, 200, 50, "BACK", BLUE)
-view_high_scores_btn = Button(300, 360, 200, 50, "HIGH SCORES", BLUE)
-help_btn = Button(300, 430, 200, 50, "Help", BLUE)
-main_menu_btn = Button(50, 520, 200, 50, "Main Menu", BLUE)
-
-# Input box
-name_input = InputBox(200, 200, 400, 32)
-
-# Add tooltips to buttons
-new_game_btn.tooltip = Tooltip("Start a new Oregon Trail adventure")
-continue_btn.tooltip = Tooltip("Continue your saved game")
-settings_btn.tooltip = Tooltip("Adjust game settings")
-
-# Initialize current_buttons
-current_buttons = [new_game_btn, continue_btn, settings_btn, view_high_scores_btn, help_btn]
-
-# Function to create buttons for different states
-def create_class_selection_buttons():
-    return [
-        Button(125, 150, 550, 50, "Banker: Start with more money", BLUE),
-        Button(125, 220, 550, 50, "Farmer: Better at hunting and gathering", BLUE),
-        Button(125, 290, 550, 50, "Carpenter: Wagon breaks down less often", BLUE),
-    ]
-
-def create_difficulty_selection_buttons():
-    return [
-        Button(300, 150, 200, 50, "EASY", GREEN),
-        Button(300, 220, 200, 50, "MEDIUM", BLUE),
-        Button(300, 290, 200, 50, "HARD", RED),
-    ]
-
-def create_travel_buttons():
-    return [
-        Button(50, 100, 200, 50, "INVENTORY", BLUE),
-        Button(50, 170, 200, 50, "CHARACTER", BLUE),
-        Button(50, 240, 200, 50, "HUNT", BLUE),
-        Button(50, 310, 200, 50, "SHOP", BLUE),
-        Button(50, 380, 200, 50, "TRAVEL", BLUE),
-    ]
-
-def create_high_scores_buttons():
-    return []
-
-# State management
-def set_state(new_state):
-    global current_state, current_buttons
-    current_state = new_state
-    if new_state == MAIN_MENU:
-        current_buttons = [new_game_btn, continue_btn, settings_btn, view_high_scores_btn, help_btn]
-    elif new_state == CHARACTER_CREATION:
-        current_buttons = [Button(300, 250, 200, 50, "NEXT", BLUE)]
-    elif new_state == CLASS_SELECTION:
-        current_buttons = create_class_selection_buttons()
-    elif new_state == DIFFICULTY_SELECTION:
-        current_buttons = create_difficulty_selection_buttons()
-    elif new_state == TRAVEL:
-        current_buttons = create_travel_buttons()
-    elif new_state == HIGH_SCORES:
-        current_buttons = create_high_scores_buttons()
-    elif new_state in [SHOP, INVENTORY, CHARACTER_PROGRESS, PROGRESS_MAP, HUNTING]:
-        current_buttons = []
-    elif new_state == VICTORY_SCREEN:
-        current_buttons = [Button(300, 300, 200, 50, "MAIN MENU", BLUE)]
-    
-    if new_state != MAIN_MENU:
-        current_buttons.append(back_btn)
-        current_buttons.append(main_menu_btn)
-
-# Hunting Mini-Game
-def hunting_game():
-    clock = pygame.time.Clock()
-    deer_width, deer_height = 50, 50
-    deer_x = random.randint(0, WIDTH - deer_width)
-    deer_y = HEIGHT // 2.3
-    deer_speed = 4
-    deer_direction = 1
-    score = 0
-    game_duration = 10000  # 10 seconds in milliseconds
-    start_time = pygame.time.get_ticks()
-
-    # Create instruction text
-    instruction_font = pygame.font.Font(None, 24)
-    instruction_text = "To score: Hover mouse over the moving square and press spacebar"
-    instruction_surf = instruction_font.render(instruction_text, True, BLACK)
-    instruction_rect = instruction_surf.get_rect(centerx=WIDTH // 2, bottom=HEIGHT - 10)
-
-    while pygame.time.get_ticks() - start_time < game_duration:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    if deer_x < pygame.mouse.get_pos()[0] < deer_x + deer_width and \
-                       deer_y < pygame.mouse.get_pos()[1] < deer_y + deer_height:
-                        score += 1
-                        deer_x = random.randint(0, WIDTH - deer_width)
-
-        deer_x += deer_speed * deer_direction
-        if deer_x <= 0 or deer_x >= WIDTH - deer_width:
-            deer_direction *= -1
-
-        # Fill the background
-        screen.fill(PRAIRIE_GREEN)
-        pygame.draw.rect(screen, SKY_BLUE, (0, 0, WIDTH, HEIGHT // 2))
-        
-        pygame.draw.rect(screen, WAGON_BROWN, (deer_x, deer_y, deer_width, deer_height))
-        
-        # Draw score
-        score_surf = small_font.render(f"Score: {score}", True, BLACK)
-        screen.blit(score_surf, (10, 10))
-
-        # Calculate and draw timer
-        time_left = (game_duration - (pygame.time.get_ticks() - start_time)) // 1000
-        timer_surf = small_font.render(f"Time left: {time_left}s", True, BLACK)
-        screen.blit(timer_surf, (WIDTH - timer_surf.get_width() - 10, 10))
-
-        # Draw instruction text
-        screen.blit(instruction_surf, instruction_rect)
-
-        pygame.display.flip()
-        clock.tick(250)
-
-    return score
-
-# Confirmation dialog
-def show_confirmation_dialog(message):
-    dialog_rect = pygame.Rect(200, 200, 400, 200)
-    pygame.draw.rect(screen, WHITE, dialog_rect)
-    pygame.draw.rect(screen, BLACK, dialog_rect, 2)
-    text_surf = small_font.render(message, True, BLACK)
-    screen.blit(text_surf, (dialog_rect.centerx - text_surf.get_width() // 2, dialog_rect.top + 50))
-    yes_btn = Button(dialog_rect.left + 50, dialog_rect.bottom - 70, 100, 40, "Yes", GREEN)
-    no_btn = Button(dialog_rect.right - 150, dialog_rect.bottom - 70, 100, 40, "No", RED)
-    yes_btn.draw(screen)
-    no_btn.draw(screen)
-    pygame.display.flip()
-    
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if yes_btn.is_clicked(event.pos):
-                    return True
-                elif no_btn.is_clicked(event.pos):
-                    return False
-    return False
-
-# Error message display
-def show_error_message(message, suggestion):
-    error_rect = pygame.Rect(200, 200, 400, 200)
-    pygame.draw.rect(screen, WHITE, error_rect)
-    pygame.draw.rect(screen, RED, error_rect, 2)
-    error_text = small_font.render(message, True, RED)
-    suggestion_text = small_font.render(suggestion, True, BLACK)
-    screen.blit(error_text, (error_rect.centerx - error_text.get_width() // 2, error_rect.top + 50))
-    screen.blit(suggestion_text, (error_rect.centerx - suggestion_text.get_width() // 2, error_rect.top + 100))
-    pygame.display.flip()
-    pygame.time.wait(3000)
-
-# Help screen
-def show_help_screen():
-    help_rect = pygame.Rect(100, 100, 600, 380)
-    pygame.draw.rect(screen, WHITE, help_rect)
-    pygame.draw.rect(screen, BLACK, help_rect, 2)
-    
-    help_text = [
-        "Goal: Travel from Independence, Missouri to Oregon City, Oregon.",
-        "- Manage your resources carefully",
-        "- Hunt for food when supplies are low",
-        "- Trade with others along the trail",
-        "- Watch out for diseases and injuries",
-        "Keyboard Shortcuts:",
-        "ESC - Return to Main Menu",
-        "I - Open Inventory",
-        "M - Open Map",
-        "H - Start Hunting",
-        "Good luck on your journey!"
-    ]
-    
-    for i, line in enumerate(help_text):
-        text_surf = small_font.render(line, True, BLACK)
-        screen.blit(text_surf, (help_rect.left + 20, help_rect.top + 20 + i * 30))
-    
-    close_btn = Button(help_rect.centerx - 50, help_rect.bottom - 40, 100, 40, "Close", RED)
-    close_btn.draw(screen)
-    
-    pygame.display.flip()
-    
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN and close_btn.is_clicked(event.pos):
-                waiting = False
-
-# Main game loop
-running = True
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if current_state == MAIN_MENU:
-                if new_game_btn.is_clicked(event.pos):
-                    if show_confirmation_dialog("Start a new game? Unsaved progress will be lost."):
-                        set_state(CHARACTER_CREATION)
-                        log_display.add_log("Started a new game")
-                elif continue_btn.is_clicked(event.pos):
-                    if game_state.load_game():
-                        set_state(TRAVEL)
-                        log_display.add_log("Continued saved game")
-                    else:
-                        show_error_message("No saved game found", "Start a new game instead")
-                elif settings_btn.is_clicked(event.pos):
-                    set_state(DIFFICULTY_SELECTION)
-                    log_display.add_log("Opened settings")
-                elif view_high_scores_btn.is_clicked(event.pos):
-                    set_state(HIGH_SCORES)
-                    log_display.add_log("Viewing high scores")
-                elif help_btn.is_clicked(event.pos):
-                    show_help_screen()
-            else:
-                for button in current_buttons:
-                    if button.is_clicked(event.pos):
-                        if button.text == "BACK":
-                            if current_state in [SHOP, INVENTORY, CHARACTER_PROGRESS, PROGRESS_MAP, HUNTING]:
-                                set_state(TRAVEL)
-                            else:
-                                set_state(MAIN_MENU)
-                            log_display.add_log(f"Returned to {'Travel' if current_state == TRAVEL else 'Main Menu'}")
-                        elif button.text == "Main Menu":
-                            if show_confirmation_dialog("Return to Main Menu?"):
-                                game_state.save_game()
-                                set_state(MAIN_MENU)
-                        elif current_state == CLASS_SELECTION:
-                            game_state.character_class = button.text.split(":")[0]
-                            set_state(DIFFICULTY_SELECTION)
-                            log_display.add_log(f"Selected class: {game_state.character_class}")
-                        elif current_state == DIFFICULTY_SELECTION:
-                            game_state.difficulty = button.text
-                            set_state(TRAVEL)
-                            log_display.add_log(f"Set difficulty: {button.text}")
-                        elif current_state == TRAVEL:
-                            if button.text == "INVENTORY":
-                                set_state(INVENTORY)
-                            elif button.text == "CHARACTER":
-                                set_state(CHARACTER_PROGRESS)
-                            elif button.text == "HUNT":
-                                score = hunting_game()
-                                log_display.add_log(f"Completed hunting game with score: {score}")
-                                set_state(TRAVEL)
-                            elif button.text == "SHOP":
-                                set_state(SHOP)
-                            elif button.text == "TRAVEL":
-                                if game_state.update_progress():
-                                    log_display.add_log(f"Traveled to {game_state.get_current_location()}")
-                                    if game_state.get_progress_percentage() >= 100:
-                                        set_state(VICTORY_SCREEN)
-                                        log_display.add_log("Congratulations! You've reached Oregon!")
-                                else:
-                                    log_display.add_log("You've already reached Oregon City!")
-                            log_display.add_log(f"Opened {button.text.lower()}")
-                        elif current_state == CHARACTER_CREATION and button.text == "NEXT":
-                            game_state.character_name = name_input.text
-                            set_state(CLASS_SELECTION)
-                            log_display.add_log(f"Created character: {game_state.character_name}")
-                        elif current_state == VICTORY_SCREEN and button.text == "MAIN MENU":
-                            set_state(MAIN_MENU)
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_ESCAPE:
-                if current_state != MAIN_MENU:
-                    if show_confirmation_dialog("Are you sure you want to return to the main menu? Your progress will be saved."):
-                        game_state.save_game()
-                        set_state(MAIN_MENU)
-            elif event.key == pygame.K_i and current_state == TRAVEL:
-                set_state(INVENTORY)
-            elif event.key == pygame.K_m and current_state == TRAVEL:
-                set_state(PROGRESS_MAP)
-            elif event.key == pygame.K_h and current_state == TRAVEL:
-                set_state(HUNTING)
-        if current_state == CHARACTER_CREATION:
-            name_input.handle_event(event)
-
-    # Fill the background
-    screen.fill(PRAIRIE_GREEN)
-    pygame.draw.rect(screen, SKY_BLUE, (0, 0, WIDTH, HEIGHT // 2))
-
-    if current_state == MAIN_MENU:
-        # Draw title
-        title_surf = title_font.render("The Oregon Trail", True, BLACK)
-        screen.blit(title_surf, (WIDTH//2 - title_surf.get_width()//2, 50))
-    elif current_state == CHARACTER_CREATION:
-        title = title_font.render("Create Character", True, BLACK)
-        screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 100))
-        name_input.draw(screen)
-    elif current_state == CLASS_SELECTION:
-        title = title_font.render("Select Class", True, BLACK)
-        screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 100))
-    elif current_state == DIFFICULTY_SELECTION:
-        title = title_font.render("Select Difficulty", True, BLACK)
-        screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 100))
-    elif current_state == TRAVEL:
-        title = title_font.render("Map of the Oregon Trail", True, BLACK)
-        screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
-        
-        # Draw the interactive map
-        game_state.interactive_map.draw()
-        map_surface = game_state.interactive_map.get_surface()
-        screen.blit(map_surface, (WIDTH - map_surface.get_width() - 20, 100))
-    elif current_state == SHOP:
-        title = title_font.render("Shop", True, BLACK)
-        screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
-    elif current_state == HIGH_SCORES:
-        title = title_font.render("High Scores", True, BLACK)
-        screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
-        # Draw empty high score list
-        pygame.draw.rect(screen, WHITE, (150, 100, 500, 330))
-        pygame.draw.rect(screen, BLACK, (150, 100, 500, 330), 2)
-    elif current_state == INVENTORY:
-        title = title_font.render("Inventory", True, BLACK)
-        screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
-    elif current_state == CHARACTER_PROGRESS:
-        title = title_font.render("Character Progress", True, BLACK)
-        screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
-    elif current_state == PROGRESS_MAP:
-        title = title_font.render("Progress Map", True, BLACK)
-        screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
-    elif current_state == VICTORY_SCREEN:
-        title = title_font.render("Victory!", True, GREEN)
-        screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 100))
-        message = button_font.render("You've successfully reached Oregon!", True, BLACK)
-        screen.blit(message, (WIDTH // 2 - message.get_width() // 2, 200))
-
-    # Draw current state's buttons
-    for button in current_buttons:
-        button.draw(screen)
-
-    # Draw tooltips
-    mouse_pos = pygame.mouse.get_pos()
-    for button in current_buttons:
-        if hasattr(button, 'tooltip') and button.tooltip is not None and button.rect.collidepoint(mouse_pos):
-            button.tooltip.draw(screen, mouse_pos)
-
-    # Draw the log display
-    log_display.draw(screen)
-    pygame.draw.rect(screen, BLACK, (log_display.rect.right - 10, log_display.rect.top, 10, log_display.rect.height))  # Scrollbar
-
-    # Draw progress bar
-    progress_bar = pygame.Rect(50, 20, 700, 20)
-    pygame.draw.rect(screen, WHITE, progress_bar, 2)
-    progress_width = int(progress_bar.width * (game_state.get_progress_percentage() / 100))
-    pygame.draw.rect(screen, GREEN, (progress_bar.left, progress_bar.top, progress_width, progress_bar.height))
-    progress_text = small_font.render(f"Progress: {game_state.get_progress_percentage():.1f}% - {game_state.get_current_location()}", True, BLACK)
-    screen.blit(progress_text, (progress_bar.left, progress_bar.bottom + 5))
-
-    pygame.display.flip()
-
-# Save game before quitting
-game_state.save_game()
-pygame.quit()
-sys.exit()
+import time
+IMPORT_STARTED = time.perf_counter()  # For the startup-time report
+import asyncio
+import pygame
+import os
+import sys
+import tempfile
+from collections import OrderedDict, deque
+from datetime import datetime
+import numpy as np
+import savegames
+import content
+import trail_engine
+import sampling
+import catalog
+import hunting
+import highscores
+import gamelog
+import recording
+import trailmap
+from profiler import Profiler
+
+# Startup timing
+# With --startup-time (or OREGON_STARTUP_TIMING=1) the game prints how long
+# each startup phase took up to the first frame; --startup-time then quits.
+STARTUP_TIMING = "--startup-time" in sys.argv or os.environ.get("OREGON_STARTUP_TIMING", "") not in ("", "0")
+startup_marks = [("imports", time.perf_counter())]
+
+def mark_startup(phase):
+    if STARTUP_TIMING:
+        startup_marks.append((phase, time.perf_counter()))
+
+def report_startup():
+    previous = IMPORT_STARTED
+    for phase, at in startup_marks:
+        print(f"{phase:<12} {(at - previous) * 1000:8.1f} ms")
+        previous = at
+    print(f"{'total':<12} {(previous - IMPORT_STARTED) * 1000:8.1f} ms to the first frame")
+
+# Session recording and replay
+#   --record FILE   record this session's input
+#   --replay FILE   play a recorded session back as fast as possible
+#   --realtime      ...or at the speed it was recorded
+#   --headless      run without a window (replays, profiling)
+# A replay exits with status 1 if the session didn't play out the same way.
+def get_option(name):
+    if name in sys.argv[1:-1]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return None
+
+RECORD_FILE = get_option("--record")
+REPLAY_FILE = get_option("--replay")
+REPLAY_REALTIME = "--realtime" in sys.argv
+HEADLESS = "--headless" in sys.argv
+session = None  # The Recorder or Replay, set up by start_session()
+
+# Content hot reload
+#   --watch-content  pick up edits to the content files (see content.py) while
+#                    playing: the rules, shop, maps and menus are rebuilt from
+#                    them and the run carries on
+WATCH_CONTENT = "--watch-content" in sys.argv
+CONTENT_POLL_MS = int(content.POLL_INTERVAL * 1000)
+content_watcher = None  # Started by main() with --watch-content
+
+# Display
+# Nothing touches SDL until init_display() runs from main(), so importing the
+# game (benchmarks, the balance tools) opens no window
+WIDTH, HEIGHT = 800, 600
+screen = None
+display_started = None
+
+def init_display():
+    global screen, renderer, display_started
+    # Only the subsystems the game uses; pygame.init() would also bring up
+    # audio and joysticks
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("The Oregon Trail")
+    renderer = DirtyRenderer(screen)
+    display_started = time.perf_counter()
+
+# Milliseconds since the display came up. pygame.time.get_ticks() needs the
+# timer subsystem, which only pygame.init() starts. While a session is recorded
+# or replayed, time and the mouse are read once per frame so a replay sees
+# exactly what the recorded session saw.
+def get_ticks():
+    if session is not None:
+        return session.ticks
+    return int((time.perf_counter() - display_started) * 1000)
+
+def get_mouse_pos():
+    if session is not None:
+        return session.mouse_pos
+    return pygame.mouse.get_pos()
+
+# Colors
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+BLUE = (0, 123, 255)
+LIGHT_BLUE = (173, 216, 230)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+DARK_GREEN = (0, 100, 0)
+PRAIRIE_GREEN = (76, 187, 23)
+SKY_BLUE = (135, 206, 235)
+WAGON_BROWN = (139, 69, 19)
+RIVER_BLUE = (65, 105, 225)
+MOUNTAIN_GRAY = (105, 105, 105)
+YELLOW = (255, 255, 0)
+
+# Fonts
+# Loaded on first use; until then a LazyFont is just its size
+class LazyFont:
+    def __init__(self, size, name=None):
+        self.size = size
+        self.name = name
+        self.font = None
+
+    def load(self):
+        if self.font is None:
+            self.font = pygame.font.Font(self.name, self.size)
+        return self.font
+
+    def render(self, text, antialias, color, background=None):
+        return self.load().render(text, antialias, color, background)
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+title_font = LazyFont(64)
+button_font = LazyFont(36)
+small_font = LazyFont(24)
+map_label_font = LazyFont(15)
+hud_font = LazyFont(18)
+
+# Text rendering cache
+# Almost every string on screen is the same from frame to frame, so rendered
+# surfaces are kept in a bounded LRU keyed by (font, text, color, antialias)
+class TextCache:
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    # Drop cached surfaces for text that will not be shown again (None matches anything)
+    def invalidate(self, text=None, font=None):
+        if text is None and font is None:
+            self.surfaces.clear()
+            return
+        for key in [key for key in self.surfaces
+                    if (font is None or key[0] is font) and (text is None or key[1] == text)]:
+            del self.surfaces[key]
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.surfaces),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+text_cache = TextCache()
+
+def render_text(font, text, color, antialias=True):
+    return text_cache.render(font, text, color, antialias)
+
+# Game states
+MAIN_MENU, CHARACTER_CREATION, CLASS_SELECTION, DIFFICULTY_SELECTION, TRAVEL, SHOP, HIGH_SCORES, VICTORY_SCREEN, DEFEAT_SCREEN, DEATH_SCREEN, RIVER_CROSSING, INVENTORY, CHARACTER_PROGRESS, PROGRESS_MAP, HUNTING = range(15)
+current_state = MAIN_MENU
+
+# Frame pacing
+# OREGON_FRAME_PACING selects how the main loop spends idle time:
+#   "adaptive" - cap animated states at TARGET_FPS, block on events in static states
+#   "capped"   - always cap at TARGET_FPS
+#   "uncapped" - redraw as fast as possible (old behaviour)
+FRAME_PACING = os.environ.get("OREGON_FRAME_PACING", "adaptive")
+TARGET_FPS = int(os.environ.get("OREGON_FPS", "60"))
+IDLE_TIMEOUT_MS = 500  # wake up at least this often while idle
+
+# States whose screen only changes in response to input. TRAVEL is one: its map
+# and log redraw when marked dirty, and toasts set the wait through update_overlays.
+IDLE_STATES = {MAIN_MENU, CHARACTER_CREATION, CLASS_SELECTION, DIFFICULTY_SELECTION, TRAVEL, SHOP, HIGH_SCORES,
+               VICTORY_SCREEN, DEFEAT_SCREEN, DEATH_SCREEN, INVENTORY, CHARACTER_PROGRESS}
+
+# Single frame scheduler shared by the main loop and the hunting game.
+# Every loop awaits next_frame() once per frame, which yields to the event loop
+# so the pygbag web build never starves the browser.
+class FramePacer:
+    def __init__(self, mode=FRAME_PACING, fps=TARGET_FPS, idle_timeout=IDLE_TIMEOUT_MS):
+        self.mode = mode
+        self.fps = fps
+        self.idle_timeout = idle_timeout
+        self.clock = pygame.time.Clock()
+        # Blocking on SDL events would freeze the browser tab
+        self.can_block = sys.platform != "emscripten"
+
+    async def next_frame(self, idle=False, fps=None, timeout=None):
+        if session is not None and session.replaying:
+            events = session.next_frame(current_state)
+            await asyncio.sleep(session.delay / 1000 if REPLAY_REALTIME else 0)
+            return events
+        await asyncio.sleep(0)
+        if self.mode == "adaptive" and idle and self.can_block:
+            # Sleep until something happens (or a timer is due) instead of spinning
+            event = pygame.event.wait(self.idle_timeout if timeout is None else max(1, min(timeout, self.idle_timeout)))
+            events = [] if event.type == pygame.NOEVENT else [event]
+            events.extend(pygame.event.get())
+            self.clock.tick()
+        else:
+            if self.mode == "uncapped":
+                self.clock.tick()
+            else:
+                self.clock.tick(fps or self.fps)
+            events = pygame.event.get()
+        if session is not None:
+            session.write_frame(int((time.perf_counter() - display_started) * 1000), current_state,
+                                pygame.mouse.get_pos(), events)
+        return events
+
+# Button class
+class Button:
+    def __init__(self, x, y, width, height, text, color, text_color=WHITE, font=button_font, button_id=None):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.id = button_id if button_id is not None else text
+        self.text = text
+        self.color = color
+        self.text_color = text_color
+        self.font = font
+        self.tooltip = None
+        self.dirty = True
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, self.color, self.rect)
+        pygame.draw.rect(surface, BLACK, self.rect, 2)  # Add a border
+        text_surf = render_text(self.font, self.text, self.text_color)
+        text_rect = text_surf.get_rect(center=self.rect.center)
+        surface.blit(text_surf, text_rect)
+
+    def is_clicked(self, pos):
+        return self.rect.collidepoint(pos)
+
+# Button showing one of the party's travel settings, e.g. the pace
+class SettingButton(Button):
+    def __init__(self, x, y, width, height, setting, color, text_color=WHITE, font=small_font, button_id=None):
+        super().__init__(x, y, width, height, "", color, text_color, font, button_id if button_id is not None else setting)
+        self.setting = setting
+
+    @property
+    def text(self):
+        return getattr(game_state, self.setting)
+
+    @text.setter
+    def text(self, value):
+        pass
+
+# Input box class
+class InputBox:
+    def __init__(self, x, y, width, height, text=''):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.color = BLACK
+        self.text = text
+        self.active = False
+        self.dirty = True
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            self.active = self.rect.collidepoint(event.pos)
+        if event.type == pygame.KEYDOWN:
+            if self.active:
+                self.dirty = True
+                text_cache.invalidate(self.text, small_font)
+                if event.key == pygame.K_RETURN:
+                    print(self.text)
+                    self.text = ''
+                elif event.key == pygame.K_BACKSPACE:
+                    self.text = self.text[:-1]
+                else:
+                    self.text += event.unicode
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, self.color, self.rect, 2)
+        text_surface = render_text(small_font, self.text, self.color)
+        surface.blit(text_surface, (self.rect.x + 5, self.rect.y + 5))
+
+# Scrolling list with a scrollbar
+# A window of visible_lines rows over a longer list; the log and the item lists
+# build on it and only ever draw the rows in view. row_count() says how many
+# rows the list has right now.
+SCROLLBAR_WIDTH = 10
+
+class ScrollList:
+    def __init__(self, x, y, width, height, visible_lines, row_count):
+        self.rect = pygame.Rect(x, y, width, height)
+        # The part of the list that is actually on screen
+        self.view_rect = self.rect.clip(pygame.Rect(0, 0, WIDTH, HEIGHT))
+        self.visible_lines = visible_lines
+        self.row_count = row_count
+        self.scroll_y = 0  # Index of the first visible row
+        self.scroll_speed = 1  # Rows per mouse wheel notch
+        self.dragging = False
+        self.dirty = True
+
+    def get_row_count(self):
+        return self.row_count()
+
+    def get_max_scroll(self):
+        return max(0, self.get_row_count() - self.visible_lines)
+
+    def scroll_to(self, scroll_y):
+        scroll_y = min(max(0, int(scroll_y)), self.get_max_scroll())
+        if scroll_y != self.scroll_y:
+            self.scroll_y = scroll_y
+            self.dirty = True
+
+    def handle_scroll(self, direction):
+        if direction == 'UP':
+            self.scroll_to(self.scroll_y - self.scroll_speed)
+        elif direction == 'DOWN':
+            self.scroll_to(self.scroll_y + self.scroll_speed)
+
+    def get_scrollbar_track(self):
+        return pygame.Rect(self.view_rect.right - SCROLLBAR_WIDTH, self.view_rect.top, SCROLLBAR_WIDTH, self.view_rect.height)
+
+    def get_scrollbar_thumb(self):
+        track = self.get_scrollbar_track()
+        total = max(self.get_row_count(), self.visible_lines)
+        height = max(12, track.height * self.visible_lines // total)
+        max_scroll = self.get_max_scroll()
+        top = track.top + (track.height - height) * self.scroll_y // max_scroll if max_scroll else track.top
+        return pygame.Rect(track.left, top, SCROLLBAR_WIDTH, height)
+
+    # Scroll so the thumb is centred on y
+    def scroll_to_y(self, y):
+        track = self.get_scrollbar_track()
+        thumb = self.get_scrollbar_thumb()
+        span = track.height - thumb.height
+        if span > 0:
+            self.scroll_to((y - track.top - thumb.height / 2) * self.get_max_scroll() / span + 0.5)
+
+    # Mouse wheel over the list, and clicking or dragging its scrollbar.
+    # Returns True if the event was used.
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEWHEEL:
+            if self.view_rect.collidepoint(get_mouse_pos()):
+                self.scroll_to(self.scroll_y - event.y * self.scroll_speed)
+                return True
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            if self.get_scrollbar_track().collidepoint(event.pos):
+                self.dragging = True
+                self.scroll_to_y(event.pos[1])
+                return True
+        elif event.type == pygame.MOUSEMOTION and self.dragging:
+            self.scroll_to_y(event.pos[1])
+            return True
+        elif event.type == pygame.MOUSEBUTTONUP and self.dragging:
+            self.dragging = False
+            return True
+        return False
+
+    def draw_scrollbar(self, surface):
+        pygame.draw.rect(surface, BLACK, self.get_scrollbar_track())
+        pygame.draw.rect(surface, LIGHT_BLUE, self.get_scrollbar_thumb())
+
+# Log Display class with scrollbar
+# Recent lines live in a bounded deque; older ones are only in the rotating
+# history file. Drawing touches just the visible lines, each rendered once into
+# a small LRU of line surfaces, so neither memory nor draw time grows with a
+# long session.
+LOG_CAPACITY = 1000       # lines kept in memory for scrolling back
+LOG_LINE_HEIGHT = 20
+
+class LogDisplay(ScrollList):
+    def __init__(self, x, y, width, height, visible_lines=5, capacity=LOG_CAPACITY, history=None):
+        super().__init__(x, y, width, height, visible_lines, lambda: len(self.entries))
+        self.entries = deque(maxlen=capacity)  # (line number, time, message)
+        self.next_line = 0
+        self.follow = True  # Keep the newest line in view until the player scrolls back
+        self.line_surfaces = OrderedDict()
+        self.history = history
+
+    def add_log(self, message):
+        now = datetime.now()
+        if not self.follow and len(self.entries) == self.entries.maxlen:
+            # The oldest line is about to fall off the front; keep the same lines in view
+            self.scroll_y = max(0, self.scroll_y - 1)
+        self.entries.append((self.next_line, now, message))
+        self.next_line += 1
+        if self.history is not None:
+            self.history.append(now, message)
+        if self.follow:
+            self.scroll_y = self.get_max_scroll()
+        else:
+            self.scroll_y = min(self.scroll_y, self.get_max_scroll())
+        self.dirty = True
+
+    def scroll_to(self, scroll_y):
+        super().scroll_to(scroll_y)
+        self.follow = self.scroll_y == self.get_max_scroll()
+
+    def get_line_surface(self, entry):
+        line_number, timestamp, message = entry
+        line_surf = self.line_surfaces.get(line_number)
+        if line_surf is None:
+            # Each line is unique, so these bypass the shared text cache. Drawn
+            # opaque on the log's white background, they blit without blending.
+            line_surf = small_font.render(f"{timestamp:%H:%M}  {message}", True, BLACK, WHITE).convert()
+            self.line_surfaces[line_number] = line_surf
+            if len(self.line_surfaces) > self.visible_lines * 4:
+                self.line_surfaces.popitem(last=False)
+        else:
+            self.line_surfaces.move_to_end(line_number)
+        return line_surf
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, WHITE, self.rect)
+        pygame.draw.rect(surface, BLACK, self.rect, 2)
+        last = min(len(self.entries), self.scroll_y + self.visible_lines)
+        for i in range(self.scroll_y, last):
+            line_surf = self.get_line_surface(self.entries[i])
+            surface.blit(line_surf, (self.rect.x + 5, self.rect.y + 5 + (i - self.scroll_y) * LOG_LINE_HEIGHT))
+        self.draw_scrollbar(surface)
+
+# Item list for the shop and inventory
+# Rows are catalog item IDs, either set directly or read from source() (e.g.
+# what the party owns) whenever the list is drawn. Only the rows in view are
+# formatted, and each distinct row is rendered once into a small LRU of row
+# surfaces, so a catalog of thousands of items scrolls as smoothly as seven.
+ITEM_ROW_HEIGHT = 26
+
+class ItemList(ScrollList):
+    # format_row(item_id) gives the text of each column; on_click(item_id,
+    # mouse_button) is called when a row is clicked
+    def __init__(self, x, y, width, height, columns, format_row, on_click=None, source=None, empty_text=""):
+        super().__init__(x, y, width, height, (height - 10) // ITEM_ROW_HEIGHT, lambda: len(self.get_rows()))
+        self.columns = columns  # x offset of each column
+        self.format_row = format_row
+        self.on_click = on_click
+        self.source = source
+        self.rows = []
+        self.empty_text = empty_text
+        self.row_surfaces = OrderedDict()
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self.scroll_y = 0
+        self.dirty = True
+
+    def get_rows(self):
+        return self.source() if self.source is not None else self.rows
+
+    def handle_event(self, event):
+        if super().handle_event(event):
+            return True
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button in (1, 3) and self.on_click is not None:
+            if self.view_rect.collidepoint(event.pos):
+                rows = self.get_rows()
+                i = self.scroll_y + (event.pos[1] - self.rect.y - 5) // ITEM_ROW_HEIGHT
+                if 0 <= i < len(rows):
+                    self.on_click(int(rows[i]), event.button)
+                    self.dirty = True
+                return True
+        return False
+
+    def get_row_surface(self, values):
+        row_surf = self.row_surfaces.get(values)
+        if row_surf is None:
+            row_surf = pygame.Surface((self.rect.width - 10 - SCROLLBAR_WIDTH, ITEM_ROW_HEIGHT))
+            row_surf.fill(WHITE)
+            for x, value in zip(self.columns, values):
+                row_surf.blit(small_font.render(value, True, BLACK, WHITE), (x, 4))
+            row_surf = row_surf.convert()
+            self.row_surfaces[values] = row_surf
+            if len(self.row_surfaces) > self.visible_lines * 4:
+                self.row_surfaces.popitem(last=False)
+        else:
+            self.row_surfaces.move_to_end(values)
+        return row_surf
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, WHITE, self.rect)
+        pygame.draw.rect(surface, BLACK, self.rect, 2)
+        rows = self.get_rows()
+        # The rows may have shrunk since the list last scrolled
+        self.scroll_y = min(self.scroll_y, self.get_max_scroll())
+        for i in range(self.scroll_y, min(len(rows), self.scroll_y + self.visible_lines)):
+            row_surf = self.get_row_surface(self.format_row(int(rows[i])))
+            surface.blit(row_surf, (self.rect.x + 5, self.rect.y + 5 + (i - self.scroll_y) * ITEM_ROW_HEIGHT))
+        if len(rows) == 0 and self.empty_text:
+            message = render_text(small_font, self.empty_text, BLACK)
+            surface.blit(message, message.get_rect(center=self.rect.center))
+        self.draw_scrollbar(surface)
+
+# Text box that reports every change, for filtering a list as the player types
+class SearchBox(InputBox):
+    def __init__(self, x, y, width, height, on_change, placeholder=""):
+        super().__init__(x, y, width, height)
+        self.on_change = on_change
+        self.placeholder = placeholder
+
+    # Returns True if the event was used, so typed letters don't also
+    # trigger keyboard shortcuts
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            active = self.rect.collidepoint(event.pos)
+            if active != self.active:
+                self.active = active
+                self.dirty = True
+        elif event.type == pygame.KEYDOWN and self.active and event.key not in (pygame.K_ESCAPE, pygame.K_RETURN):
+            if event.key == pygame.K_BACKSPACE:
+                self.text = self.text[:-1]
+            elif event.unicode.isprintable():
+                self.text += event.unicode
+            self.dirty = True
+            self.on_change(self.text)
+            return True
+        return False
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, WHITE, self.rect)
+        pygame.draw.rect(surface, BLUE if self.active else BLACK, self.rect, 2)
+        if self.text:
+            text_surface = small_font.render(self.text, True, BLACK)
+        else:
+            text_surface = render_text(small_font, self.placeholder, MOUNTAIN_GRAY)
+        surface.blit(text_surface, (self.rect.x + 5, self.rect.y + 8))
+
+# What's in the shopping cart and what the party can spend
+class CartSummary:
+    def __init__(self, cart, x, y, width, height):
+        self.cart = cart
+        self.rect = pygame.Rect(x, y, width, height)
+        self.dirty = True
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, WHITE, self.rect)
+        pygame.draw.rect(surface, BLACK, self.rect, 2)
+        total = self.cart.total()
+        lines = [(f"Cart: {len(self.cart)} items, ${total}", RED if total > game_state.money else BLACK),
+                 (f"Money: ${game_state.money}", BLACK)]
+        for i, (line, color) in enumerate(lines):
+            surface.blit(small_font.render(line, True, color), (self.rect.x + 10, self.rect.y + 8 + i * 24))
+
+# Progress bar with the current location underneath
+class ProgressBar:
+    def __init__(self, x, y, width, height):
+        self.bar_rect = pygame.Rect(x, y, width, height)
+        self.rect = pygame.Rect(x, y, width, height + 25)  # Includes the caption
+        self.percentage = 0
+        self.location = ""
+        self.dirty = True
+
+    def set_progress(self, percentage, location):
+        if percentage != self.percentage or location != self.location:
+            text_cache.invalidate(self.get_caption(), small_font)
+            self.percentage = percentage
+            self.location = location
+            self.dirty = True
+
+    def get_caption(self):
+        return f"Progress: {self.percentage:.1f}% - {self.location}"
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, WHITE, self.bar_rect, 2)
+        progress_width = int(self.bar_rect.width * (self.percentage / 100))
+        pygame.draw.rect(surface, GREEN, (self.bar_rect.left, self.bar_rect.top, progress_width, self.bar_rect.height))
+        progress_text = render_text(small_font, self.get_caption(), BLACK)
+        surface.blit(progress_text, (self.bar_rect.left, self.bar_rect.bottom + 5))
+
+# Tooltip class
+class Tooltip:
+    def __init__(self, text, font=small_font):
+        self.text = text
+        self.font = font
+        self.surface = None  # Rendered the first time it is shown
+        self.rect = None
+
+    def load(self):
+        if self.surface is None:
+            self.surface = render_text(self.font, self.text, BLACK)
+            self.rect = self.surface.get_rect()
+
+    def get_bounds(self, pos):
+        self.load()
+        return self.rect.move(pos[0] - self.rect.x, pos[1] - self.rect.y).inflate(10, 10)
+
+    def draw(self, screen, pos):
+        self.load()
+        self.rect.topleft = pos
+        pygame.draw.rect(screen, LIGHT_BLUE, self.rect.inflate(10, 10))
+        pygame.draw.rect(screen, BLACK, self.rect.inflate(10, 10), 2)
+        screen.blit(self.surface, self.rect)
+
+MAP_SIZE = content.MAP_SIZE
+
+# Trail, markers and labels are the same in every run, so they are drawn once
+# and shared: trail_layer holds just the trail, base_layer the whole map before
+# any progress
+class MapLayers:
+    def __init__(self, routes, size=MAP_SIZE):
+        self.trail_layer = pygame.Surface(size)
+        self.trail_layer.fill(WHITE)  # White background
+
+        # Draw the trail
+        route_points = list(routes.values())
+        if len(route_points) >= 2:
+            pygame.draw.lines(self.trail_layer, RED, False, route_points, 3)
+
+        # Draw location markers
+        self.base_layer = self.trail_layer.copy()
+        self.markers = []
+        for location, pos in routes.items():
+            pygame.draw.circle(self.base_layer, BLUE, pos, 5)
+            text = render_text(map_label_font, location, BLACK)
+            text_rect = text.get_rect(center=(pos[0], pos[1] - 10))
+            self.base_layer.blit(text, text_rect)
+            self.markers.append((location, pos, text, text_rect))
+
+map_layers = None  # Drawn the first time a map is
+
+def get_map_layers():
+    global map_layers
+    if map_layers is None:
+        map_layers = MapLayers(trail_engine.ROUTES)
+    return map_layers
+
+# Interactive Map class
+class InteractiveMap:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.surface = pygame.Surface(MAP_SIZE)
+        self.routes = trail_engine.ROUTES
+        self.progress = 0
+        self.reached_locations = set()
+        self.version = 0  # Bumped whenever the drawn map would change
+        self.overlay_dirty = True
+
+    # Progress is an overlay on the shared layers, rebuilt only when it changes
+    def draw(self):
+        if not self.overlay_dirty:
+            return
+        self.overlay_dirty = False
+        layers = get_map_layers()
+        if not self.reached_locations:
+            self.surface.blit(layers.base_layer, (0, 0))
+            return
+        self.surface.blit(layers.trail_layer, (0, 0))
+
+        # Draw progress
+        if self.progress > 0:
+            route_points = list(self.routes.values())
+            progress_points = route_points[:int(self.progress * len(route_points)) + 1]
+            if len(progress_points) >= 2:
+                pygame.draw.lines(self.surface, GREEN, False, progress_points, 5)
+
+        # Markers go on top of the progress line, using the cached label surfaces
+        for location, pos, text, text_rect in layers.markers:
+            color = GREEN if location in self.reached_locations else BLUE
+            pygame.draw.circle(self.surface, color, pos, 5)
+            self.surface.blit(text, text_rect)
+
+    def update_progress(self, progress):
+        self.progress = progress
+        self.reached_locations = set(list(self.routes.keys())[:int(progress * len(self.routes)) + 1])
+        self.overlay_dirty = True
+        self.version += 1
+
+    def set_progress(self, progress):
+        if progress != self.progress:
+            self.update_progress(progress)
+
+    def get_surface(self):
+        return self.surface
+
+# Screen panel showing an InteractiveMap, redrawn only when the map changes
+class MapPanel:
+    def __init__(self, interactive_map, x, y):
+        self.map = interactive_map
+        self.rect = pygame.Rect((x, y), interactive_map.get_surface().get_size())
+        self.drawn_version = None
+        self._dirty = True
+
+    @property
+    def dirty(self):
+        return self._dirty or self.drawn_version != self.map.version
+
+    @dirty.setter
+    def dirty(self, value):
+        self._dirty = value
+
+    def draw(self, surface):
+        if self.drawn_version != self.map.version:
+            self.map.draw()
+            self.drawn_version = self.map.version
+        surface.blit(self.map.get_surface(), self.rect)
+
+trail_tiles = None  # Tiles of the PROGRESS_MAP map, drawn as they come into view
+
+def get_trail_tiles():
+    global trail_tiles
+    if trail_tiles is None:
+        trail_tiles = trailmap.TilePyramid(trail_engine.ROUTES, MAP_SIZE)
+    return trail_tiles
+
+MAP_TILES_PER_FRAME = 4  # new tiles drawn per frame; the rest show a lower level scaled up until their turn
+MAP_PAN_STEP = 60        # pixels an arrow key moves the map
+
+# The PROGRESS_MAP screen's map: drag to pan, mouse wheel to zoom. The trail
+# comes from the shared tile pyramid; the party's progress is drawn over it
+# every frame, so travelling never invalidates a tile.
+class ZoomableMap:
+    def __init__(self, x, y, width, height):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.tiles = get_trail_tiles()
+        self.level = 0
+        self.center = (MAP_SIZE[0] / 2, MAP_SIZE[1] / 2)  # map units at the middle of the view
+        self.drag_pos = None
+        self.pending = False     # some visible tiles are still placeholders
+        self.drawn_miles = None
+        self._dirty = True
+
+    @property
+    def dirty(self):
+        return self._dirty or self.pending or self.drawn_miles != game_state.miles
+
+    @dirty.setter
+    def dirty(self, value):
+        self._dirty = value
+
+    # The view in pixels of the current level
+    def get_view(self):
+        scale = self.tiles.get_scale(self.level)
+        return pygame.Rect(round(self.center[0] * scale - self.rect.width / 2),
+                           round(self.center[1] * scale - self.rect.height / 2), self.rect.width, self.rect.height)
+
+    def to_screen(self, x, y):
+        scale = self.tiles.get_scale(self.level)
+        view = self.get_view()
+        return round(x * scale) - view.left + self.rect.left, round(y * scale) - view.top + self.rect.top
+
+    def to_map(self, pos):
+        scale = self.tiles.get_scale(self.level)
+        view = self.get_view()
+        return (pos[0] - self.rect.left + view.left) / scale, (pos[1] - self.rect.top + view.top) / scale
+
+    # Centre on a map point, keeping some of the map in view
+    def look_at(self, x, y):
+        self.center = (min(max(0, x), MAP_SIZE[0]), min(max(0, y), MAP_SIZE[1]))
+        self.dirty = True
+
+    def pan(self, dx, dy):
+        scale = self.tiles.get_scale(self.level)
+        self.look_at(self.center[0] - dx / scale, self.center[1] - dy / scale)
+
+    # Zoom in (steps > 0) or out a level at a time, keeping the map point
+    # under anchor (a screen position) where it is
+    def zoom(self, steps, anchor=None):
+        level = min(max(0, self.level + steps), self.tiles.max_level)
+        if level == self.level:
+            return
+        anchor = anchor or self.rect.center
+        x, y = self.to_map(anchor)
+        self.level = level
+        scale = self.tiles.get_scale(level)
+        self.look_at(x - (anchor[0] - self.rect.centerx) / scale, y - (anchor[1] - self.rect.centery) / scale)
+
+    def find_party(self):
+        self.look_at(*trail_engine.route_position(game_state.miles))
+
+    # Returns True if the event was used
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEWHEEL:
+            mouse_pos = get_mouse_pos()
+            if self.rect.collidepoint(mouse_pos):
+                self.zoom(1 if event.y > 0 else -1, mouse_pos)
+                return True
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self.rect.collidepoint(event.pos):
+            self.drag_pos = event.pos
+            return True
+        elif event.type == pygame.MOUSEMOTION and self.drag_pos is not None:
+            self.pan(event.pos[0] - self.drag_pos[0], event.pos[1] - self.drag_pos[1])
+            self.drag_pos = event.pos
+            return True
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1 and self.drag_pos is not None:
+            self.drag_pos = None
+            return True
+        elif event.type == pygame.KEYDOWN:
+            if event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                self.zoom(1)
+            elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                self.zoom(-1)
+            elif event.key in MAP_PAN_KEYS:
+                self.pan(*MAP_PAN_KEYS[event.key])
+            elif event.key == pygame.K_HOME:
+                self.find_party()
+            else:
+                return False
+            return True
+        return False
+
+    def draw(self, surface):
+        clip = surface.get_clip()
+        surface.set_clip(self.rect.clip(clip))
+        surface.fill(trailmap.BACKGROUND, self.rect)
+
+        # Tiles, drawing at most MAP_TILES_PER_FRAME new ones this frame
+        budget = MAP_TILES_PER_FRAME
+        self.pending = False
+        for tx, ty, x, y in self.tiles.get_visible_tiles(self.level, self.get_view()):
+            rendered = self.tiles.rendered
+            tile = self.tiles.get_tile(self.level, tx, ty, render=budget > 0)
+            budget -= self.tiles.rendered - rendered
+            if tile is None:
+                self.pending = True
+                tile = self.tiles.get_placeholder(self.level, tx, ty)
+                if tile is None:
+                    continue
+            surface.blit(tile, (self.rect.left + x, self.rect.top + y))
+        self.draw_progress(surface)
+        surface.set_clip(clip)
+        self.drawn_miles = game_state.miles
+
+    # The trail behind the party, the landmarks it has reached, and the wagon
+    def draw_progress(self, surface):
+        reached = game_state.current_location_index
+        points = [self.to_screen(*point) for point in list(trail_engine.ROUTES.values())[:reached + 1]]
+        party = self.to_screen(*trail_engine.route_position(game_state.miles))
+        width = trailmap.trail_width(self.level) + 2
+        if game_state.miles > 0:
+            pygame.draw.lines(surface, GREEN, False, points + [party], width)
+            for point in points[1:]:
+                pygame.draw.circle(surface, GREEN, point, width // 2)
+        for point in points:
+            pygame.draw.circle(surface, GREEN, point, trailmap.marker_radius(self.level))
+        radius = trailmap.marker_radius(self.level) + 2
+        pygame.draw.circle(surface, WAGON_BROWN, party, radius)
+        pygame.draw.circle(surface, WHITE, party, radius, 2)
+
+MAP_PAN_KEYS = {pygame.K_LEFT: (MAP_PAN_STEP, 0), pygame.K_RIGHT: (-MAP_PAN_STEP, 0),
+                pygame.K_UP: (0, MAP_PAN_STEP), pygame.K_DOWN: (0, -MAP_PAN_STEP)}
+
+# Paged high score table. Pages are rendered once into surfaces and reused
+# until the filter changes or a new run is recorded.
+class HighScoreList:
+    def __init__(self, store, x, y, width, height, rows_per_page=10):
+        self.store = store
+        self.rect = pygame.Rect(x, y, width, height)
+        self.rows_per_page = rows_per_page
+        self.difficulty = None
+        self.character_class = None
+        self.page = 0
+        self.pages = {}
+        self.rows = None
+        self.store_version = None
+        self.dirty = True
+
+    def set_filter(self, difficulty, character_class):
+        self.difficulty = difficulty
+        self.character_class = character_class
+        self.rows = None
+        self.page = 0
+        self.dirty = True
+
+    def get_rows(self):
+        if self.rows is None or self.store_version != self.store.version:
+            self.rows = self.store.top(self.difficulty, self.character_class)
+            self.store_version = self.store.version
+            self.pages = {}
+        return self.rows
+
+    def get_page_count(self):
+        return max(1, -(-len(self.get_rows()) // self.rows_per_page))
+
+    def turn_page(self, step):
+        page = min(max(0, self.page + step), self.get_page_count() - 1)
+        if page != self.page:
+            self.page = page
+            self.dirty = True
+
+    def render_page(self, page):
+        surface = pygame.Surface(self.rect.size)
+        surface.fill(WHITE)
+        pygame.draw.rect(surface, BLACK, surface.get_rect(), 2)
+        columns = [(10, "#"), (50, "Name"), (220, "Class"), (330, "Difficulty"), (430, "Score")]
+        for x, heading in columns:
+            surface.blit(render_text(small_font, heading, BLUE), (x, 8))
+        rows = self.get_rows()[page * self.rows_per_page:(page + 1) * self.rows_per_page]
+        for i, row in enumerate(rows):
+            y = 36 + i * 26
+            values = [str(page * self.rows_per_page + i + 1), row[1][:14], row[2] or "-", row[3] or "-", str(row[4])]
+            for (x, _), value in zip(columns, values):
+                # Rows are drawn straight from the font; caching them would only
+                # churn the shared text cache
+                surface.blit(small_font.render(value, True, BLACK), (x, y))
+        if not rows:
+            message = render_text(small_font, "No finished runs yet", BLACK)
+            surface.blit(message, message.get_rect(center=(self.rect.width // 2, self.rect.height // 2)))
+        footer = render_text(small_font, f"Page {page + 1} of {self.get_page_count()}", BLACK)
+        surface.blit(footer, footer.get_rect(right=self.rect.width - 10, bottom=self.rect.height - 6))
+        return surface
+
+    def draw(self, surface):
+        self.get_rows()
+        if self.page not in self.pages:
+            self.pages[self.page] = self.render_page(self.page)
+        surface.blit(self.pages[self.page], self.rect)
+
+# Profiler HUD: FPS, frame time percentiles and the costliest phases. The
+# text is rebuilt a few times a second, not every frame.
+class ProfilerHUD:
+    def __init__(self, profiler, x, y, width=230, lines=12, refresh_ms=250):
+        self.profiler = profiler
+        self.rect = pygame.Rect(x, y, width, 10 + lines * 16)
+        self.lines = lines
+        self.refresh_ms = refresh_ms
+        self.surface = None
+        self.updated_at = None
+
+    @property
+    def dirty(self):
+        return self.profiler.enabled
+
+    @dirty.setter
+    def dirty(self, value):
+        pass
+
+    def get_lines(self):
+        stats = self.profiler.get_stats()
+        if stats is None:
+            return ["Profiling..."]
+        lines = [
+            f"{stats['fps']:.0f} FPS  ({self.profiler.loop})",
+            f"frame p50 {stats['frame_p50']:.2f}  p95 {stats['frame_p95']:.2f}  p99 {stats['frame_p99']:.2f}",
+            f"busy  p50 {stats['busy_p50']:.2f}  p99 {stats['busy_p99']:.2f} ms",
+        ]
+        for phase, ms in stats["phases"].items():
+            lines.append(f"{phase:<24} {ms:7.3f} ms")
+        return lines[:self.lines]
+
+    def draw(self, surface):
+        now = get_ticks()
+        if self.surface is None or now - self.updated_at >= self.refresh_ms:
+            self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+            self.surface.fill((0, 0, 0, 170))
+            for i, line in enumerate(self.get_lines()):
+                # Numbers change constantly, so these bypass the text cache
+                self.surface.blit(hud_font.render(line, True, WHITE), (6, 5 + i * 16))
+            self.updated_at = now
+        surface.blit(self.surface, self.rect)
+
+# Retained renderer: per-state backgrounds are composited once, and each frame
+# only the rects of dirty widgets (and the moving tooltip) are redrawn and pushed
+class DirtyRenderer:
+    def __init__(self, surface):
+        self.surface = surface
+        self.screen_rect = surface.get_rect()
+        self.backgrounds = {}
+        self.dirty_rects = []
+        self.full_redraw = True
+        self.state = None
+        self.tooltip_rect = None
+
+    def invalidate(self, rect=None):
+        if rect is None:
+            self.full_redraw = True
+        else:
+            self.dirty_rects.append(pygame.Rect(rect))
+
+    def get_background(self, state):
+        background = self.backgrounds.get(state)
+        if background is None:
+            background = pygame.Surface(self.screen_rect.size).convert()
+            draw_state_background(background, state)
+            self.backgrounds[state] = background
+        return background
+
+    def render(self, state, widgets, tooltip=None, tooltip_pos=None):
+        if state != self.state:
+            self.state = state
+            self.full_redraw = True
+        for widget in widgets:
+            if widget.dirty:
+                self.dirty_rects.append(widget.rect.copy())
+
+        tooltip_rect = tooltip.get_bounds(tooltip_pos) if tooltip is not None else None
+        if tooltip_rect != self.tooltip_rect:
+            for rect in (self.tooltip_rect, tooltip_rect):
+                if rect is not None:
+                    self.dirty_rects.append(rect)
+            self.tooltip_rect = tooltip_rect
+
+        if self.full_redraw:
+            rects = [self.screen_rect.copy()]
+        else:
+            rects = [rect.clip(self.screen_rect) for rect in self.dirty_rects]
+            rects = [rect for rect in rects if rect.width and rect.height]
+        self.dirty_rects = []
+        if not rects:
+            return rects
+
+        background = self.get_background(state)
+        profiling = profiler.enabled
+        for rect in rects:
+            self.surface.set_clip(rect)
+            self.surface.blit(background, rect, rect)
+            for widget in widgets:
+                if widget.rect.colliderect(rect):
+                    if profiling:
+                        start = time.perf_counter()
+                        widget.draw(self.surface)
+                        profiler.add("draw " + type(widget).__name__, (time.perf_counter() - start) * 1000)
+                    else:
+                        widget.draw(self.surface)
+            if tooltip_rect is not None and tooltip_rect.colliderect(rect):
+                tooltip.draw(self.surface, tooltip_pos)
+        self.surface.set_clip(None)
+        for widget in widgets:
+            widget.dirty = False
+        profiler.mark("draw")
+
+        if self.full_redraw:
+            self.full_redraw = False
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+        profiler.mark("present")
+        return rects
+
+# Game state
+# The rules themselves live in trail_engine; this holds one party's run. The
+# maps that show it belong to their screens, so a GameState can be driven
+# without a display.
+# Every random draw in a run comes from streams seeded by one number, stored in
+# the save; OREGON_SEED=<seed> replays a run's dice exactly.
+RUN_SEED = int(os.environ["OREGON_SEED"]) if os.environ.get("OREGON_SEED") else None
+
+# One run's mutable state. Everything that is the same in every run (the
+# trail, its landmarks, the drawn map) is shared at module level, so a server
+# or a simulation can hold thousands of these.
+class GameState:
+    __slots__ = ("character_name", "character_class", "difficulty", "inventory", "progress", "health",
+                 "money", "miles", "day", "pace", "rations", "current_location_index", "last_events",
+                 "streams", "journal_seq", "snapshot_seq", "slot")
+    locations = trail_engine.LOCATIONS
+    total_distance = trail_engine.TOTAL_DISTANCE
+
+    def __init__(self, seed=RUN_SEED):
+        self.character_name = ""
+        self.character_class = ""
+        self.difficulty = ""
+        self.inventory = catalog.Inventory.from_dict(catalog.CATALOG, {"food": trail_engine.START_FOOD})
+        self.progress = 0
+        self.health = trail_engine.START_HEALTH
+        self.money = trail_engine.START_MONEY
+        self.miles = 0            # distance travelled so far
+        self.day = 0              # days on the trail
+        self.pace = trail_engine.PACES[0]
+        self.rations = trail_engine.RATIONS[0]
+        self.current_location_index = 0
+        self.last_events = []
+        self.streams = sampling.RandomStreams(seed)
+        self.journal_seq = 0      # last journal entry applied to this state
+        self.snapshot_seq = 0     # journal_seq at the last full save
+        self.slot = None          # save slot, if not named after the character
+
+    # Seed for the run started after this one. It comes from this run's seed,
+    # so a replayed session starts the same new runs as the recorded one.
+    def get_next_seed(self):
+        return int(np.random.SeedSequence(self.streams.seed).generate_state(2, np.uint64)[0])
+
+    # The map marks progress by landmarks reached
+    def get_map_progress(self):
+        return self.current_location_index / trail_engine.LAST_LOCATION
+
+    def set_character_class(self, character_class):
+        self.character_class = character_class
+        self.money = trail_engine.starting_money(character_class)
+
+    def add_hunted_food(self, score):
+        food = score * trail_engine.HUNT_FOOD_PER_HIT
+        self.inventory["food"] = self.inventory.get("food", 0) + food
+        return food
+
+    # Buy everything in the cart as one transaction; False if it costs more
+    # than the party has
+    def buy(self, cart):
+        money = cart.checkout(self.inventory, self.money)
+        if money is None:
+            return False
+        self.money = money
+        self.record("purchase", money=self.money, inventory=dict(self.inventory))
+        return True
+
+    # Journal a state change (the fields it set) instead of rewriting the whole
+    # save; every so often the journal is compacted into a full save
+    def record(self, action, **changes):
+        self.journal_seq += 1
+        save_manager.record(self.get_slot_name(), {"seq": self.journal_seq, "action": action, "set": changes})
+        if self.journal_seq - self.snapshot_seq >= savegames.COMPACT_EVERY:
+            self.save_game()
+
+    def is_alive(self):
+        return self.health > 0
+
+    # Travel day by day towards the next landmark: all the way there, or for at
+    # most max_days days. The days are simulated in one batch. Returns a summary
+    # of the trip, or None if the party can't travel. last_events lists what
+    # happened on arrival at a landmark.
+    def travel(self, max_days=None):
+        if self.current_location_index >= len(self.locations) - 1 or not self.is_alive():
+            return None
+        pace_idx = trail_engine.pace_index(self.pace)
+        ration_idx = trail_engine.ration_index(self.rations)
+        target = trail_engine.LANDMARK_MILES[self.current_location_index + 1]
+        days = int(trail_engine.days_to_travel(target - self.miles, pace_idx))
+        if max_days is not None:
+            days = min(days, max_days)
+        start_food = self.inventory.get("food", 0)
+        health, food, days_travelled, starved = trail_engine.travel_days(
+            np.array([self.health], dtype=np.int32), np.array([start_food], dtype=np.int32),
+            np.array([pace_idx]), np.array([ration_idx]), np.array([days]), self.streams.travel.random((2, 1, days)))
+        start_health = self.health
+        self.health = int(health[0])
+        self.inventory["food"] = int(food[0])
+        self.day += int(days_travelled[0])
+        self.miles = min(target, self.miles + int(days_travelled[0]) * int(trail_engine.PACE_MILES[pace_idx]))
+        self.last_events = []
+
+        if self.is_alive() and self.miles >= target:
+            # Arriving at a landmark brings its own hazards
+            health, money, event_food, events = trail_engine.resolve_legs(
+                np.array([self.health], dtype=np.int32), np.array([self.money], dtype=np.int32),
+                np.array([self.inventory["food"]], dtype=np.int32), trail_engine.class_index(self.character_class),
+                trail_engine.difficulty_index(self.difficulty), self.current_location_index,
+                self.streams.events.random((3, 1)))
+            self.health = int(health[0])
+            self.money = int(money[0])
+            self.inventory["food"] = int(event_food[0])
+            self.last_events = [name for name, happened in events.items() if happened[0]]
+            if self.is_alive():
+                self.current_location_index = trail_engine.location_at(self.miles)
+        self.progress = trail_engine.progress_percentage(self.miles)
+        return {
+            "days": int(days_travelled[0]),
+            "miles": self.miles,
+            "food_eaten": start_food - int(food[0]),
+            "days_without_food": int(starved[0]),
+            "health_change": self.health - start_health,
+            "arrived": self.miles >= target and self.is_alive(),
+            "miles_to_go": target - self.miles,
+        }
+
+    # Travel all the way to the next landmark
+    def update_progress(self):
+        return self.travel() is not None
+
+    def get_current_location(self):
+        return self.locations[self.current_location_index]
+
+    def get_progress_percentage(self):
+        return self.progress
+
+    # Plain-data copy of the run, taken on the main thread for the save writer
+    def to_snapshot(self):
+        return {
+            "character_name": self.character_name,
+            "character_class": self.character_class,
+            "difficulty": self.difficulty,
+            "inventory": dict(self.inventory),
+            "progress": self.progress,
+            "current_location_index": self.current_location_index,
+            "miles": self.miles,
+            "day": self.day,
+            "pace": self.pace,
+            "rations": self.rations,
+            "health": self.health,
+            "money": self.money,
+            "seed": self.streams.seed,
+            "rng_state": self.streams.get_state(),
+            "journal_seq": self.journal_seq,
+        }
+
+    def from_snapshot(self, data):
+        self.character_name = data["character_name"]
+        self.character_class = data["character_class"]
+        self.difficulty = data["difficulty"]
+        self.inventory = catalog.Inventory.from_dict(catalog.CATALOG, data["inventory"])
+        # Older saves only stored the percentage of landmarks reached
+        self.current_location_index = data.get("current_location_index",
+                                               round(data["progress"] / 100 * (len(self.locations) - 1)))
+        self.miles = data.get("miles", trail_engine.LANDMARK_MILES[self.current_location_index])
+        self.progress = trail_engine.progress_percentage(self.miles)
+        self.day = data.get("day", 0)
+        self.pace = data.get("pace", trail_engine.PACES[0])
+        self.rations = data.get("rations", trail_engine.RATIONS[0])
+        self.health = data["health"]
+        self.money = data["money"]
+        # Carry on the saved run's dice where they left off
+        if data.get("seed") is None or data["seed"] != self.streams.seed:
+            self.streams = sampling.RandomStreams(data.get("seed"))
+        if "rng_state" in data:
+            self.streams.set_state(data["rng_state"])
+        self.journal_seq = self.snapshot_seq = data.get("journal_seq", 0)
+
+    def get_slot_name(self):
+        return savegames.slot_name(self.slot or self.character_name)
+
+    def get_save_summary(self):
+        return {
+            "character_name": self.character_name,
+            "character_class": self.character_class,
+            "difficulty": self.difficulty,
+            "location": self.get_current_location(),
+            "progress": self.progress,
+        }
+
+    # Saving is queued for the background writer and returns immediately
+    def save_game(self, slot=None):
+        save_manager.save(slot or self.get_slot_name(), self.to_snapshot(), self.get_save_summary())
+        self.snapshot_seq = self.journal_seq
+
+    def load_game(self, slot=None):
+        data = save_manager.load(slot)
+        if data is None:
+            return False
+        self.from_snapshot(data)
+        return True
+
+# Saves and high scores only touch the disk when first used
+save_manager = savegames.SaveManager()
+high_scores = highscores.HighScores()
+game_state = GameState()
+log_display = LogDisplay(270, 500, 510, 280, history=gamelog.LogHistory())
+progress_bar = ProgressBar(50, 20, 700, 20)
+high_score_list = None  # Built with the HIGH_SCORES scene
+interactive_map = None  # Built with the TRAVEL scene
+progress_map = None  # Built with the PROGRESS_MAP scene
+shop_cart = catalog.Cart(catalog.CATALOG)
+shop_category = None  # Category the shop is filtered to, None for all
+shop_search = shop_list = cart_summary = None  # Built with the SHOP scene
+renderer = None  # Created by init_display()
+pacer = FramePacer()
+profiler = Profiler.from_env()  # F3 toggles it while playing
+profiler_hud = ProfilerHUD(profiler, WIDTH - 240, 70)
+
+# Navigation buttons shared by every scene but the main menu
+back_btn = Button(50, 450, 200, 50, "BACK", BLUE, button_id="back")
+main_menu_btn = Button(50, 520, 200, 50, "Main Menu", BLUE, button_id="main_menu")
+
+# Input box
+name_input = InputBox(200, 200, 400, 32)
+
+# Scene class
+# Each game state is built the first time it is visited: its buttons, the
+# widgets the renderer draws for it, a table of click handlers keyed by button
+# id and a table of key handlers. Switching state just swaps the current scene.
+class Scene:
+    def __init__(self, state, buttons=(), widgets=(), handlers=None, key_handlers=None, back_state=MAIN_MENU,
+                 event_widgets=()):
+        self.state = state
+        self.buttons = list(buttons)
+        self.handlers = handlers or {}
+        self.key_handlers = key_handlers or {}
+        self.back_state = back_state
+        # Drawing order: state widgets, buttons, then the shared log and progress bar
+        self.widgets = list(widgets) + self.buttons + [log_display, progress_bar]
+        # Widgets that see input before the buttons and shortcuts do
+        self.event_widgets = list(event_widgets)
+
+    # Returns True if one of the scene's widgets used the event
+    def handle_event(self, event):
+        for widget in self.event_widgets:
+            if widget.handle_event(event):
+                return True
+        return False
+
+    def get_clicked_button(self, pos):
+        for button in self.buttons:
+            if button.is_clicked(pos):
+                return button
+        return None
+
+current_scene = None
+current_buttons = []
+
+# State management
+def set_state(new_state):
+    global current_state, current_scene, current_buttons
+    current_state = new_state
+    current_scene = get_scene(new_state)
+    current_buttons = current_scene.buttons
+
+# Raised when the window is closed inside a nested loop such as the hunting
+# game, so that main() still saves and shuts down as usual
+class QuitGame(Exception):
+    pass
+
+# Hunting Mini-Game
+async def hunting_game():
+    # The herd moves at a fixed simulation rate; frames are only drawn at the
+    # normal render rate and interpolate between simulation steps
+    engine = hunting.HuntingEngine(WIDTH, HEIGHT, game_state.character_class, seed=game_state.streams.hunting.integers(2**32))
+
+    # Create instruction text
+    instruction_text = "To score: Hover mouse over the moving square and press spacebar"
+    instruction_surf = render_text(small_font, instruction_text, BLACK)
+    instruction_rect = instruction_surf.get_rect(centerx=WIDTH // 2, bottom=HEIGHT - 10)
+
+    # Sky and prairie never change, so they are drawn once
+    background = pygame.Surface((WIDTH, HEIGHT))
+    background.fill(PRAIRIE_GREEN)
+    pygame.draw.rect(background, SKY_BLUE, (0, 0, WIDTH, HEIGHT // 2))
+    background.blit(instruction_surf, instruction_rect)
+
+    last_ticks = get_ticks()
+    while not engine.is_over():
+        profiler.start_frame("hunting", HUNTING)
+        events = await pacer.next_frame(fps=TARGET_FPS)
+        profiler.mark("wait")
+        for event in events:
+            if event.type == pygame.QUIT:
+                raise QuitGame()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                engine.shoot(*get_mouse_pos())
+        profiler.mark("events")
+
+        ticks = get_ticks()
+        alpha = engine.advance((ticks - last_ticks) / 1000)
+        last_ticks = ticks
+        profiler.mark("simulate")
+
+        screen.blit(background, (0, 0))
+        for x, y in engine.get_draw_positions(alpha):
+            screen.fill(WAGON_BROWN, (int(x), int(y), hunting.ANIMAL_WIDTH, hunting.ANIMAL_HEIGHT))
+
+        # Draw score
+        score_surf = render_text(small_font, f"Score: {engine.score}", BLACK)
+        screen.blit(score_surf, (10, 10))
+
+        # Draw timer
+        timer_surf = render_text(small_font, f"Time left: {int(engine.time_left())}s", BLACK)
+        screen.blit(timer_surf, (WIDTH - timer_surf.get_width() - 10, 10))
+        if profiler.enabled:
+            profiler_hud.draw(screen)
+        profiler.mark("draw")
+
+        pygame.display.flip()
+        profiler.mark("present")
+
+    score = engine.score
+    renderer.invalidate()
+    return score
+
+# Overlays
+# Dialogs, the help screen and error toasts are pushed onto an overlay stack
+# that the main loop draws over the current scene. A modal overlay receives all
+# input until it closes; results are passed back through callbacks, so the main
+# loop keeps pacing frames while a dialog is open.
+overlays = []
+
+def push_overlay(overlay):
+    overlays.append(overlay)
+    renderer.invalidate(overlay.rect)
+
+def close_overlay(overlay):
+    if overlay in overlays:
+        overlays.remove(overlay)
+        renderer.invalidate(overlay.rect)
+
+def get_modal_overlay():
+    for overlay in reversed(overlays):
+        if overlay.modal:
+            return overlay
+    return None
+
+# Close overlays whose timer ran out; returns ms until the next one is due
+def update_overlays(now):
+    next_due = None
+    for overlay in list(overlays):
+        if overlay.expires_at is None:
+            continue
+        if now >= overlay.expires_at:
+            close_overlay(overlay)
+        elif next_due is None or overlay.expires_at - now < next_due:
+            next_due = overlay.expires_at - now
+    return next_due
+
+class Overlay:
+    modal = True
+
+    def __init__(self, rect):
+        self.rect = pygame.Rect(rect)
+        self.expires_at = None
+        self.dirty = True
+
+    def handle_event(self, event):
+        pass
+
+    def draw(self, surface):
+        pass
+
+# Confirmation dialog
+class ConfirmDialog(Overlay):
+    def __init__(self, message, on_result):
+        super().__init__((200, 200, 400, 200))
+        self.message = message
+        self.on_result = on_result
+        self.yes_btn = Button(self.rect.left + 50, self.rect.bottom - 70, 100, 40, "Yes", GREEN)
+        self.no_btn = Button(self.rect.right - 150, self.rect.bottom - 70, 100, 40, "No", RED)
+
+    def close(self, result):
+        close_overlay(self)
+        self.on_result(result)
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.yes_btn.is_clicked(event.pos):
+                self.close(True)
+            elif self.no_btn.is_clicked(event.pos):
+                self.close(False)
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            self.close(False)
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, WHITE, self.rect)
+        pygame.draw.rect(surface, BLACK, self.rect, 2)
+        text_surf = render_text(small_font, self.message, BLACK)
+        surface.blit(text_surf, (self.rect.centerx - text_surf.get_width() // 2, self.rect.top + 50))
+        self.yes_btn.draw(surface)
+        self.no_btn.draw(surface)
+
+def show_confirmation_dialog(message, on_result):
+    push_overlay(ConfirmDialog(message, on_result))
+
+# Error message display, closes itself after a few seconds
+class ErrorToast(Overlay):
+    modal = False
+
+    def __init__(self, message, suggestion, duration=3000):
+        super().__init__((200, 200, 400, 200))
+        self.message = message
+        self.suggestion = suggestion
+        self.expires_at = get_ticks() + duration
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, WHITE, self.rect)
+        pygame.draw.rect(surface, RED, self.rect, 2)
+        error_text = render_text(small_font, self.message, RED)
+        suggestion_text = render_text(small_font, self.suggestion, BLACK)
+        surface.blit(error_text, (self.rect.centerx - error_text.get_width() // 2, self.rect.top + 50))
+        surface.blit(suggestion_text, (self.rect.centerx - suggestion_text.get_width() // 2, self.rect.top + 100))
+
+def show_error_message(message, suggestion):
+    push_overlay(ErrorToast(message, suggestion))
+
+# Help screen
+HELP_TEXT = content.get()["help"]
+
+class HelpOverlay(Overlay):
+    def __init__(self):
+        super().__init__((100, 100, 600, 380))
+        self.close_btn = Button(self.rect.centerx - 50, self.rect.bottom - 40, 100, 40, "Close", RED)
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN and self.close_btn.is_clicked(event.pos):
+            close_overlay(self)
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            close_overlay(self)
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, WHITE, self.rect)
+        pygame.draw.rect(surface, BLACK, self.rect, 2)
+        for i, line in enumerate(HELP_TEXT):
+            text_surf = render_text(small_font, line, BLACK)
+            surface.blit(text_surf, (self.rect.left + 20, self.rect.top + 20 + i * 30))
+        self.close_btn.draw(surface)
+
+def show_help_screen():
+    push_overlay(HelpOverlay())
+
+# Save slot list for CONTINUE, built from the save index alone
+class SlotPickerOverlay(Overlay):
+    max_slots = 6
+
+    def __init__(self, slots, on_pick):
+        super().__init__((150, 100, 500, 400))
+        self.on_pick = on_pick
+        self.slot_buttons = []
+        for i, (slot, summary) in enumerate(slots[:self.max_slots]):
+            label = f"{summary.get('character_name') or slot} - {summary.get('location', '')} ({summary.get('saved_at', '')[:10]})"
+            self.slot_buttons.append(Button(self.rect.left + 20, self.rect.top + 20 + i * 55, self.rect.width - 40, 45,
+                                            label, BLUE, font=small_font, button_id=slot))
+        self.cancel_btn = Button(self.rect.centerx - 50, self.rect.bottom - 50, 100, 40, "Cancel", RED)
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            for button in self.slot_buttons:
+                if button.is_clicked(event.pos):
+                    close_overlay(self)
+                    self.on_pick(button.id)
+                    return
+            if self.cancel_btn.is_clicked(event.pos):
+                close_overlay(self)
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            close_overlay(self)
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, WHITE, self.rect)
+        pygame.draw.rect(surface, BLACK, self.rect, 2)
+        for button in self.slot_buttons:
+            button.draw(surface)
+        self.cancel_btn.draw(surface)
+
+# Click handlers, looked up by button id in the current scene's table.
+# Handlers are plain functions, except for ones that run a mini-game loop.
+def on_new_game(button):
+    def start_new_game(confirmed):
+        global game_state
+        if confirmed:
+            # The last run (dead, arrived or abandoned) stays behind in its save
+            game_state = GameState(seed=game_state.get_next_seed())
+            set_state(CHARACTER_CREATION)
+            log_display.add_log("Started a new game")
+    show_confirmation_dialog("Start a new game? Unsaved progress will be lost.", start_new_game)
+
+def continue_game(slot):
+    if game_state.load_game(slot):
+        set_state(TRAVEL if game_state.is_alive() else DEATH_SCREEN)
+        log_display.add_log("Continued saved game")
+    else:
+        show_error_message("No saved game found", "Start a new game instead")
+
+def on_continue(button):
+    slots = save_manager.list_slots()
+    if len(slots) > 1:
+        push_overlay(SlotPickerOverlay(slots, continue_game))
+    else:
+        continue_game(slots[0][0] if slots else None)
+
+def on_settings(button):
+    set_state(DIFFICULTY_SELECTION)
+    log_display.add_log("Opened settings")
+
+def on_high_scores(button):
+    set_state(HIGH_SCORES)
+    high_score_list.dirty = True  # Pick up runs finished since the screen was last shown
+    log_display.add_log("Viewing high scores")
+
+# Filter buttons cycle through "ALL" and each difficulty or class
+def cycle_filter(button, choices):
+    button.text = choices[(choices.index(button.text) + 1) % len(choices)]
+    button.dirty = True
+
+def on_filter_difficulty(button):
+    cycle_filter(button, ["ALL"] + trail_engine.DIFFICULTIES[1:])
+    high_score_list.set_filter(None if button.text == "ALL" else button.text, high_score_list.character_class)
+
+def on_filter_class(button):
+    cycle_filter(button, ["ALL"] + trail_engine.CLASSES[1:])
+    high_score_list.set_filter(high_score_list.difficulty, None if button.text == "ALL" else button.text)
+
+def on_previous_page(button):
+    high_score_list.turn_page(-1)
+
+def on_next_page(button):
+    high_score_list.turn_page(1)
+
+def on_help(button):
+    show_help_screen()
+
+def on_back(button):
+    set_state(current_scene.back_state)
+    log_display.add_log(f"Returned to {'Travel' if current_state == TRAVEL else 'Main Menu'}")
+
+# Save and leave for the main menu once the player confirms
+def save_and_exit_to_menu(confirmed):
+    if confirmed:
+        game_state.save_game()
+        set_state(MAIN_MENU)
+
+def on_main_menu(button):
+    show_confirmation_dialog("Return to Main Menu?", save_and_exit_to_menu)
+
+def on_next(button):
+    game_state.character_name = name_input.text
+    set_state(CLASS_SELECTION)
+    log_display.add_log(f"Created character: {game_state.character_name}")
+
+def on_select_class(button):
+    game_state.set_character_class(button.id)
+    game_state.record("class", character_class=game_state.character_class, money=game_state.money)
+    set_state(DIFFICULTY_SELECTION)
+    log_display.add_log(f"Selected class: {game_state.character_class}")
+
+def on_select_difficulty(button):
+    game_state.difficulty = button.id
+    game_state.record("difficulty", difficulty=game_state.difficulty)
+    game_state.save_game()  # The run starts here, so give it a full save to replay from
+    set_state(TRAVEL)
+    log_display.add_log(f"Set difficulty: {button.text}")
+
+def on_inventory(button):
+    set_state(INVENTORY)
+    log_display.add_log(f"Opened {button.text.lower()}")
+
+def on_character(button):
+    set_state(CHARACTER_PROGRESS)
+    log_display.add_log(f"Opened {button.text.lower()}")
+
+async def on_hunt(button):
+    score = await hunting_game()
+    food = game_state.add_hunted_food(score)
+    game_state.record("hunt", inventory=dict(game_state.inventory), rng_state=game_state.streams.get_state())
+    log_display.add_log(f"Completed hunting game with score: {score} ({food} lbs of food)")
+    set_state(TRAVEL)
+    log_display.add_log(f"Opened {button.text.lower()}")
+
+def on_shop(button):
+    set_state(SHOP)
+    log_display.add_log(f"Opened {button.text.lower()}")
+
+def format_shop_row(item_id):
+    item = catalog.CATALOG[item_id]
+    packs = shop_cart.packs.get(item_id)
+    price = f"${item.price} each" if item.pack == 1 else f"${item.price} per {item.pack} {item.unit}"
+    return (item.name, price, f"Have {game_state.inventory.counts[item_id]}",
+            f"+{packs * item.pack}" if packs else "")
+
+def format_inventory_row(item_id):
+    item = catalog.CATALOG[item_id]
+    return (item.name, f"{game_state.inventory.counts[item_id]} {item.unit}", item.category)
+
+# Left click adds a pack of the item to the cart, right click takes one out
+def on_shop_item(item_id, mouse_button):
+    shop_cart.add(item_id, 1 if mouse_button == 1 else -1)
+    cart_summary.dirty = True
+
+def filter_shop():
+    shop_list.set_rows(catalog.CATALOG.search(shop_search.text, shop_category))
+
+def on_shop_search(text):
+    filter_shop()
+
+def on_shop_category(button):
+    global shop_category
+    cycle_filter(button, ["ALL"] + catalog.CATALOG.categories)
+    shop_category = None if button.text == "ALL" else button.text
+    filter_shop()
+
+def on_buy(button):
+    if len(shop_cart) == 0:
+        log_display.add_log("Your cart is empty.")
+        return
+    total = shop_cart.total()
+    if not game_state.buy(shop_cart):
+        log_display.add_log(f"You can't afford that: the cart costs ${total} and you have ${game_state.money}.")
+        return
+    log_display.add_log(f"Bought supplies for ${total} (${game_state.money} left)")
+    shop_list.dirty = True
+    cart_summary.dirty = True
+
+def on_clear_cart(button):
+    shop_cart.clear()
+    shop_list.dirty = True
+    cart_summary.dirty = True
+
+# Log and record a stretch of travel, then move on if the trip ended the run
+def after_travel(trip):
+    game_state.record("travel", current_location_index=game_state.current_location_index, miles=game_state.miles,
+                      day=game_state.day, progress=game_state.progress, health=game_state.health,
+                      money=game_state.money, inventory=dict(game_state.inventory),
+                      rng_state=game_state.streams.get_state())
+    if trip["arrived"]:
+        log_display.add_log(f"Traveled {trip['days']} days to {game_state.get_current_location()} (day {game_state.day})")
+    else:
+        log_display.add_log(f"Traveled {trip['days']} days, {trip['miles_to_go']} miles to "
+                            f"{game_state.locations[game_state.current_location_index + 1]}")
+    log_display.add_log(f"Ate {trip['food_eaten']} lbs of food ({game_state.inventory['food']} left), "
+                        f"health {game_state.health}")
+    if trip["days_without_food"]:
+        log_display.add_log(f"Out of food for {trip['days_without_food']} days!")
+    for trail_event in game_state.last_events:
+        log_display.add_log(TRAIL_EVENT_MESSAGES[trail_event])
+    if not game_state.is_alive():
+        set_state(DEATH_SCREEN)
+        log_display.add_log("Your party has died on the trail.")
+    elif game_state.get_progress_percentage() >= 100:
+        score = high_scores.add_run(game_state.character_name, game_state.character_class,
+                                    game_state.difficulty, game_state.health, game_state.money,
+                                    game_state.inventory.get("food", 0))
+        set_state(VICTORY_SCREEN)
+        log_display.add_log("Congratulations! You've reached Oregon!")
+        log_display.add_log(f"Final score: {score}")
+
+# Fast-forward to the next landmark
+def on_travel(button):
+    trip = game_state.travel()
+    if trip is None:
+        log_display.add_log("You've already reached Oregon City!")
+        return
+    after_travel(trip)
+
+def on_travel_day(button):
+    trip = game_state.travel(max_days=1)
+    if trip is None:
+        log_display.add_log("You've already reached Oregon City!")
+        return
+    after_travel(trip)
+
+def on_pace(button):
+    game_state.pace = trail_engine.PACES[(trail_engine.pace_index(game_state.pace) + 1) % len(trail_engine.PACES)]
+    button.dirty = True
+    game_state.record("pace", pace=game_state.pace)
+    log_display.add_log(f"Set pace: {game_state.pace}")
+
+def on_rations(button):
+    game_state.rations = trail_engine.RATIONS[(trail_engine.ration_index(game_state.rations) + 1) % len(trail_engine.RATIONS)]
+    button.dirty = True
+    game_state.record("rations", rations=game_state.rations)
+    log_display.add_log(f"Set rations: {game_state.rations}")
+
+def on_map_zoom_in(button):
+    progress_map.zoom(1)
+
+def on_map_zoom_out(button):
+    progress_map.zoom(-1)
+
+def on_find_party(button):
+    progress_map.find_party()
+
+def on_finish(button):
+    set_state(MAIN_MENU)
+
+# One button per (id, text, color) choice, stacked as a content layout says
+def make_choice_buttons(layout, choices):
+    return [Button(layout["x"], layout["y"] + i * layout["spacing"], layout["width"], layout["height"], text, color,
+                   button_id=choice_id)
+            for i, (choice_id, text, color) in enumerate(choices)]
+
+# Build a state's scene; called the first time the state is visited
+def build_scene(state):
+    global high_score_list, interactive_map, progress_map, shop_search, shop_list, cart_summary
+
+    def make_scene(buttons=(), handlers=None, widgets=(), key_handlers=None, back_state=MAIN_MENU, event_widgets=()):
+        table = {"back": on_back, "main_menu": on_main_menu}
+        table.update(handlers or {})
+        return Scene(state, list(buttons) + [back_btn, main_menu_btn], widgets, table, key_handlers, back_state,
+                     event_widgets)
+
+    if state == MAIN_MENU:
+        new_game_btn = Button(300, 150, 200, 50, "NEW GAME", BLUE, button_id="new_game")
+        continue_btn = Button(300, 220, 200, 50, "CONTINUE", BLUE, button_id="continue")
+        settings_btn = Button(300, 290, 200, 50, "SETTINGS", BLUE, button_id="settings")
+        view_high_scores_btn = Button(300, 360, 200, 50, "HIGH SCORES", BLUE, button_id="high_scores")
+        help_btn = Button(300, 430, 200, 50, "Help", BLUE, button_id="help")
+        new_game_btn.tooltip = Tooltip("Start a new Oregon Trail adventure")
+        continue_btn.tooltip = Tooltip("Continue your saved game")
+        settings_btn.tooltip = Tooltip("Adjust game settings")
+        return Scene(MAIN_MENU, [new_game_btn, continue_btn, settings_btn, view_high_scores_btn, help_btn],
+                     handlers={"new_game": on_new_game, "continue": on_continue, "settings": on_settings,
+                               "high_scores": on_high_scores, "help": on_help})
+    if state == CHARACTER_CREATION:
+        return make_scene([Button(300, 250, 200, 50, "NEXT", BLUE, button_id="next")],
+                          {"next": on_next}, widgets=[name_input])
+    if state == CLASS_SELECTION:
+        data = content.get()
+        return make_scene(make_choice_buttons(data["class_layout"], [
+            (record["id"], f"{record['id']}: {record['description']}", BLUE) for record in data["classes"]
+        ]), dict.fromkeys(trail_engine.CLASSES[1:], on_select_class))
+    if state == DIFFICULTY_SELECTION:
+        data = content.get()
+        return make_scene(make_choice_buttons(data["difficulty_layout"], [
+            (record["id"], record["id"], tuple(record["color"])) for record in data["difficulties"]
+        ]), dict.fromkeys(trail_engine.DIFFICULTIES[1:], on_select_difficulty))
+    if state == TRAVEL:
+        interactive_map = InteractiveMap(400, 300)
+        interactive_map.update_progress(game_state.get_map_progress())
+        map_panel = MapPanel(interactive_map, WIDTH - 510 - 20, 100)
+        pace_btn = SettingButton(50, 310, 95, 50, "pace", BLUE)
+        pace_btn.tooltip = Tooltip("Pace: faster covers more miles but wears the party down")
+        rations_btn = SettingButton(155, 310, 95, 50, "rations", BLUE)
+        rations_btn.tooltip = Tooltip("Rations: more food per day keeps the party healthy")
+        day_btn = Button(50, 380, 85, 50, "1 DAY", BLUE, font=small_font, button_id="travel_day")
+        day_btn.tooltip = Tooltip("Travel for a single day")
+        travel_btn = Button(145, 380, 105, 50, "TRAVEL", BLUE, font=small_font, button_id="travel")
+        travel_btn.tooltip = Tooltip("Travel to the next landmark")
+        return make_scene([
+            Button(50, 100, 200, 50, "INVENTORY", BLUE, button_id="inventory"),
+            Button(50, 170, 200, 50, "CHARACTER", BLUE, button_id="character"),
+            Button(50, 240, 95, 50, "HUNT", BLUE, font=small_font, button_id="hunt"),
+            Button(155, 240, 95, 50, "SHOP", BLUE, font=small_font, button_id="shop"),
+            pace_btn,
+            rations_btn,
+            day_btn,
+            travel_btn,
+        ], {"inventory": on_inventory, "character": on_character, "hunt": on_hunt, "shop": on_shop,
+            "pace": on_pace, "rations": on_rations, "travel_day": on_travel_day, "travel": on_travel},
+            widgets=[map_panel], key_handlers={pygame.K_i: INVENTORY, pygame.K_m: PROGRESS_MAP, pygame.K_h: HUNTING})
+    if state == SHOP:
+        shop_search = SearchBox(50, 110, 200, 36, on_shop_search, "Search items")
+        shop_list = ItemList(270, 110, 510, 320, [5, 160, 330, 430], format_shop_row, on_click=on_shop_item,
+                             empty_text="No items match")
+        cart_summary = CartSummary(shop_cart, 50, 215, 200, 60)
+        filter_shop()
+        category_btn = Button(50, 160, 200, 40, "ALL", BLUE, font=small_font, button_id="category")
+        category_btn.tooltip = Tooltip("Filter by category")
+        return make_scene([
+            category_btn,
+            Button(50, 330, 95, 50, "BUY", GREEN, font=small_font, button_id="buy"),
+            Button(155, 330, 95, 50, "CLEAR", RED, font=small_font, button_id="clear_cart"),
+        ], {"category": on_shop_category, "buy": on_buy, "clear_cart": on_clear_cart},
+            widgets=[shop_search, shop_list, cart_summary], back_state=TRAVEL,
+            event_widgets=[shop_search, shop_list])
+    if state == INVENTORY:
+        inventory_list = ItemList(270, 110, 510, 320, [5, 200, 360], format_inventory_row,
+                                  source=lambda: game_state.inventory.owned(), empty_text="Your wagon is empty")
+        return make_scene(widgets=[inventory_list], back_state=TRAVEL, event_widgets=[inventory_list])
+    if state == PROGRESS_MAP:
+        progress_map = ZoomableMap(270, 100, 510, 390)
+        return make_scene([
+            Button(50, 100, 200, 50, "ZOOM IN", BLUE, button_id="zoom_in"),
+            Button(50, 170, 200, 50, "ZOOM OUT", BLUE, button_id="zoom_out"),
+            Button(50, 240, 200, 50, "FIND PARTY", BLUE, button_id="find_party"),
+        ], {"zoom_in": on_map_zoom_in, "zoom_out": on_map_zoom_out, "find_party": on_find_party},
+            widgets=[progress_map], back_state=TRAVEL, event_widgets=[progress_map])
+    if state in (CHARACTER_PROGRESS, HUNTING):
+        return make_scene(back_state=TRAVEL)
+    if state == HIGH_SCORES:
+        high_score_list = HighScoreList(high_scores, 150, 100, 500, 330)
+        difficulty_filter_btn = Button(670, 100, 110, 40, "ALL", BLUE, font=small_font, button_id="filter_difficulty")
+        difficulty_filter_btn.tooltip = Tooltip("Filter by difficulty")
+        class_filter_btn = Button(670, 150, 110, 40, "ALL", BLUE, font=small_font, button_id="filter_class")
+        class_filter_btn.tooltip = Tooltip("Filter by class")
+        return make_scene([
+            difficulty_filter_btn,
+            class_filter_btn,
+            Button(420, 440, 110, 40, "PREV", BLUE, font=small_font, button_id="previous_page"),
+            Button(540, 440, 110, 40, "NEXT", BLUE, font=small_font, button_id="next_page"),
+        ], {"filter_difficulty": on_filter_difficulty, "filter_class": on_filter_class,
+            "previous_page": on_previous_page, "next_page": on_next_page}, widgets=[high_score_list])
+    if state in (VICTORY_SCREEN, DEATH_SCREEN):
+        return make_scene([Button(300, 300, 200, 50, "MAIN MENU", BLUE, button_id="finish")], {"finish": on_finish})
+    return make_scene()
+
+SCENES = {}
+
+def get_scene(state):
+    scene = SCENES.get(state)
+    if scene is None:
+        scene = SCENES[state] = build_scene(state)
+    return scene
+
+# Switch the game over to new content. The rules, catalog and scores take it
+# first (the rules check it against their events before changing anything),
+# then the run is moved onto the new catalog and trail, and everything drawn
+# from the old content is dropped to be rebuilt on demand.
+def apply_content(data):
+    global HELP_TEXT, shop_cart, map_layers, trail_tiles, interactive_map, progress_map
+    for module in (trail_engine, catalog, highscores, hunting):
+        module.apply_content(data)
+    content.loaded = data
+    HELP_TEXT = data["help"]
+    GameState.locations = trail_engine.LOCATIONS
+    GameState.total_distance = trail_engine.TOTAL_DISTANCE
+    game_state.inventory = catalog.Inventory.from_dict(catalog.CATALOG, dict(game_state.inventory))
+    game_state.miles = min(game_state.miles, trail_engine.TOTAL_DISTANCE)
+    game_state.current_location_index = trail_engine.location_at(game_state.miles)
+    game_state.progress = trail_engine.progress_percentage(game_state.miles)
+    shop_cart = catalog.Cart(catalog.CATALOG)
+    map_layers = trail_tiles = interactive_map = progress_map = None
+    SCENES.clear()
+    renderer.backgrounds.clear()
+    renderer.invalidate()
+    set_state(current_state)
+
+# Apply the content files if they changed; True if they were. A file that
+# doesn't check out is reported and the game keeps the content it has.
+def reload_content():
+    try:
+        data = content_watcher.poll()
+        if data is None:
+            return False
+        apply_content(data)
+    except content.ContentError as e:
+        print(f"Content not reloaded: {e}", file=sys.stderr)
+        show_error_message("Content not reloaded", "See the console for the error")
+        return True
+    log_display.add_log("Reloaded game content")
+    return True
+
+# Static part of each state's screen, composited once per state by the renderer
+def draw_state_background(surface, state):
+    surface.fill(PRAIRIE_GREEN)
+    pygame.draw.rect(surface, SKY_BLUE, (0, 0, WIDTH, HEIGHT // 2))
+
+    if state == MAIN_MENU:
+        # Draw title
+        title_surf = render_text(title_font, "The Oregon Trail", BLACK)
+        surface.blit(title_surf, (WIDTH//2 - title_surf.get_width()//2, 50))
+    elif state == CHARACTER_CREATION:
+        title = render_text(title_font, "Create Character", BLACK)
+        surface.blit(title, (WIDTH // 2 - title.get_width() // 2, 100))
+    elif state == CLASS_SELECTION:
+        title = render_text(title_font, "Select Class", BLACK)
+        surface.blit(title, (WIDTH // 2 - title.get_width() // 2, 100))
+    elif state == DIFFICULTY_SELECTION:
+        title = render_text(title_font, "Select Difficulty", BLACK)
+        surface.blit(title, (WIDTH // 2 - title.get_width() // 2, 100))
+    elif state == TRAVEL:
+        title = render_text(title_font, "Map of the Oregon Trail", BLACK)
+        surface.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
+    elif state == SHOP:
+        title = render_text(title_font, "Shop", BLACK)
+        surface.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
+        hint = render_text(small_font, "Click an item to add it to the cart, right-click to take it out", BLACK)
+        surface.blit(hint, (270, 438))
+    elif state == HIGH_SCORES:
+        title = render_text(title_font, "High Scores", BLACK)
+        surface.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
+        surface.blit(render_text(small_font, "Filter", BLACK), (670, 78))
+    elif state == INVENTORY:
+        title = render_text(title_font, "Inventory", BLACK)
+        surface.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
+    elif state == CHARACTER_PROGRESS:
+        title = render_text(title_font, "Character Progress", BLACK)
+        surface.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
+    elif state == PROGRESS_MAP:
+        title = render_text(title_font, "Progress Map", BLACK)
+        surface.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
+        for i, line in enumerate(["Drag to move the map", "Scroll or +/- to zoom", "Home finds your party"]):
+            surface.blit(render_text(small_font, line, BLACK), (50, 310 + i * 24))
+    elif state == VICTORY_SCREEN:
+        title = render_text(title_font, "Victory!", GREEN)
+        surface.blit(title, (WIDTH // 2 - title.get_width() // 2, 100))
+        message = render_text(button_font, "You've successfully reached Oregon!", BLACK)
+        surface.blit(message, (WIDTH // 2 - message.get_width() // 2, 200))
+    elif state == DEATH_SCREEN:
+        title = render_text(title_font, "You Have Died", RED)
+        surface.blit(title, (WIDTH // 2 - title.get_width() // 2, 100))
+        message = render_text(button_font, "Your party did not survive the trail.", BLACK)
+        surface.blit(message, (WIDTH // 2 - message.get_width() // 2, 200))
+
+# Widgets drawn on top of the state background, in drawing order
+def get_state_widgets(state):
+    return get_scene(state).widgets
+
+# Log lines for the things that can happen on a leg of the trail
+TRAIL_EVENT_MESSAGES = {
+    "illness": "Someone in your party fell ill.",
+    "breakdown": f"Your wagon broke down. Repairs cost ${trail_engine.REPAIR_COST}.",
+    "stranded": "Your wagon broke down and you couldn't pay for repairs.",
+    "storm": "A storm battered your wagon.",
+    "thieves": "Thieves raided your wagon in the night.",
+    "wild_fruit": f"You found wild fruit and gathered {trail_engine.WILD_FRUIT_FOOD} lbs of food.",
+    "medicine": f"You bought medicine for ${trail_engine.MEDICINE_COST}.",
+}
+
+# Tooltip hover tracking, so mouse motion only redraws when a tooltip is involved
+def get_hovered_tooltip_button(pos):
+    for button in current_buttons:
+        if button.tooltip is not None and button.rect.collidepoint(pos):
+            return button
+    return None
+
+# Main game loop
+# Start recording or replaying if asked to on the command line. A recording
+# carries the saves there were when it started. A replay runs against a scratch
+# save directory holding just those, so it never touches real saves, and rolls
+# its dice from the recorded seed.
+def start_session():
+    global session, save_manager, high_scores, game_state
+    if HEADLESS:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+    if REPLAY_FILE:
+        session = recording.Replay(REPLAY_FILE)
+        scratch = tempfile.mkdtemp(prefix="oregon-replay-")
+        save_manager = savegames.SaveManager(scratch)
+        save_manager.import_files(session.saves)
+        high_scores = highscores.HighScores(scratch)
+        log_display.history = gamelog.LogHistory(scratch)
+        game_state = GameState(seed=session.seed)
+    elif RECORD_FILE:
+        session = recording.Recorder(RECORD_FILE, game_state.streams.seed, save_manager.export_files())
+    return time.perf_counter()
+
+def end_session(session_started):
+    if session is None:
+        return 0
+    session.close()
+    if not session.replaying:
+        print(f"Recorded {session.frames} frames to {RECORD_FILE}")
+        return 0
+    elapsed = time.perf_counter() - session_started
+    played = session.ticks / 1000
+    print(f"Replayed {session.frames} frames ({played:.1f}s of play) in {elapsed:.2f}s "
+          f"({played / elapsed if elapsed else 0:.1f}x real time)")
+    if session.divergence is not None:
+        frame, recorded, replayed = session.divergence
+        print(f"Replay diverged at frame {frame}: recorded state {recorded}, replayed state {replayed}")
+        return 1
+    if not session.finished:
+        print("Replay stopped before the end of the recording")
+        return 1
+    return 0
+
+async def main():
+    global content_watcher
+    init_display()
+    mark_startup("display")
+    if WATCH_CONTENT:
+        content_watcher = content.ContentWatcher()
+    set_state(MAIN_MENU)
+    mark_startup("main menu")
+    needs_redraw = True
+    hovered_button = None
+    running = True
+    try:
+        while running:
+            profiler.start_frame("main", current_state)
+            idle = current_state in IDLE_STATES
+            timeout = update_overlays(get_ticks())
+            if content_watcher is not None:
+                # Wake up to look for changed content even when nothing else happens
+                timeout = min(timeout or CONTENT_POLL_MS, CONTENT_POLL_MS)
+            profiler.mark("overlays")
+            events = await pacer.next_frame(idle, timeout=timeout)
+            profiler.mark("wait")
+            for event in events:
+                if event.type == pygame.QUIT:
+                    running = False
+                    continue
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.toggle()
+                    renderer.invalidate(profiler_hud.rect)
+                    continue
+                modal = get_modal_overlay()
+                if modal is not None:
+                    if event.type != pygame.MOUSEMOTION:
+                        modal.handle_event(event)
+                        needs_redraw = True
+                    continue
+                if current_scene.handle_event(event) or log_display.handle_event(event):
+                    needs_redraw = True
+                    continue
+                if event.type == pygame.MOUSEMOTION:
+                    # Motion only matters while a tooltip is (or was) under the cursor
+                    now_hovered = get_hovered_tooltip_button(event.pos)
+                    if now_hovered is not None or hovered_button is not None:
+                        needs_redraw = True
+                    hovered_button = now_hovered
+                    continue
+                needs_redraw = True
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    button = current_scene.get_clicked_button(event.pos)
+                    if button is not None:
+                        result = current_scene.handlers[button.id](button)
+                        if asyncio.iscoroutine(result):
+                            try:
+                                await result
+                            except QuitGame:
+                                running = False
+                                break
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        if current_state != MAIN_MENU:
+                            show_confirmation_dialog("Are you sure you want to return to the main menu? Your progress will be saved.",
+                                                     save_and_exit_to_menu)
+                    elif event.key in current_scene.key_handlers:
+                        set_state(current_scene.key_handlers[event.key])
+                if current_state == CHARACTER_CREATION:
+                    name_input.handle_event(event)
+
+            profiler.mark("events")
+            save_manager.tick()  # Write out journal entries that are due
+            profiler.mark("journal")
+            if content_watcher is not None and reload_content():
+                needs_redraw = True
+
+            if idle and not needs_redraw and not renderer.dirty_rects and pacer.mode != "uncapped":
+                continue
+            needs_redraw = False
+
+            progress_bar.set_progress(game_state.get_progress_percentage(), game_state.get_current_location())
+            if interactive_map is not None:
+                interactive_map.set_progress(game_state.get_map_progress())
+            mouse_pos = get_mouse_pos()
+            hovered = get_hovered_tooltip_button(mouse_pos) if get_modal_overlay() is None else None
+            widgets = get_state_widgets(current_state)
+            if overlays:
+                widgets = widgets + overlays
+            if profiler.enabled:
+                widgets = widgets + [profiler_hud]
+            profiler.mark("update")
+            renderer.render(current_state, widgets, hovered.tooltip if hovered is not None else None, mouse_pos)
+            if STARTUP_TIMING and startup_marks[-1][0] == "main menu":
+                mark_startup("first frame")
+                report_startup()
+                if "--startup-time" in sys.argv:
+                    running = False
+
+        # Save game before quitting (returning to the main menu has already saved)
+        if current_state != MAIN_MENU:
+            game_state.save_game()
+    finally:
+        # However main() ends, write out the queued saves and buffered journal entries
+        save_manager.flush()
+        log_display.history.close()
+        profiler.close()
+        pygame.quit()
+
+
+mark_startup("module")
+
+# The same entry point runs natively and under pygbag in the browser
+if __name__ == "__main__":
+    session_started = start_session()
+    try:
+        asyncio.run(main())
+    finally:
+        status = end_session(session_started)
+    sys.exit(status)
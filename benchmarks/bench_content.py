@@ -0,0 +1,70 @@
+# Content loading: parsing and checking the files vs reading the compiled cache
+#
+#   python benchmarks/bench_content.py --items 20000 --landmarks 2000
+#
+# Builds a content pack that size in a scratch directory, from the game's own
+# files, and times loading it three ways: cold (no cache, so every file is
+# parsed, checked and the cache written), cached (files unchanged, as on a
+# normal start) and touched (mtimes changed but not the contents, so the files
+# are hashed and the cache kept).
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+from common import summarize, time_calls
+
+import content
+import trail_engine
+
+
+def make_pack(directory, items, landmarks):
+    for name in content.FILES:
+        shutil.copy(os.path.join(content.CONTENT_DIR, name), directory)
+    # The game's own items that a pack must have, then made-up ones
+    with open(os.path.join(content.CONTENT_DIR, "items.json")) as f:
+        required = [item for item in json.load(f)["items"] if item["key"] in content.REQUIRED_ITEMS]
+    with open(os.path.join(directory, "items.json"), "w") as f:
+        json.dump({"items": required + [{"key": f"item{i}", "name": f"Item {i:05d}", "category": f"Category {i % 20}",
+                                         "price": 1 + i % 50, "pack": 1 + i % 3, "unit": "units"}
+                                        for i in range(items - len(required))]}, f)
+    # Landmarks zig-zag across the map, a mile apart
+    width, height = content.MAP_SIZE
+    with open(os.path.join(directory, "trail.json"), "w") as f:
+        segments = trail_engine.SEGMENTS
+        json.dump({"landmarks": [{"name": f"LANDMARK {i}", "x": i * 7 % width, "y": height - 1 - i * height // landmarks,
+                                  "miles": i, "segment": segments[i * len(segments) // landmarks]}
+                                 for i in range(landmarks)]}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time content loading with and without the compiled cache")
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--landmarks", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="oregon-content-")
+    make_pack(directory, args.items, args.landmarks)
+    cache_path = content.get_cache_path(directory)
+
+    def cold():
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        content.load(directory)
+
+    def touched():
+        os.utime(os.path.join(directory, "items.json"))
+        content.load(directory)
+
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in content.FILES)
+    print(f"{args.items} items, {args.landmarks} landmarks, {size / 1024:,.0f} KB of JSON")
+    print(f"{'load':<10} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, func in [("cold", cold), ("cached", lambda: content.load(directory)), ("touched", touched)]:
+        row = summarize(time_calls(func, args.iterations, warmup=2))
+        print(f"{name:<10} {row['mean_ms']:>9.2f} {row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
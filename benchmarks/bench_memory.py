@@ -0,0 +1,74 @@
+# Memory held per run: a GameState, a server session and a simulated party
+#
+#   python benchmarks/bench_memory.py --sessions 5000
+#
+# Python allocations are counted with tracemalloc while thousands of runs are
+# created, after one has been made so anything shared is already loaded.
+# Surfaces live in SDL's memory, which tracemalloc can't see, so the map is
+# reported from its pixel sizes: one set of layers shared by the process, and
+# the single map the TRAVEL screen draws into.
+import argparse
+import gc
+import tracemalloc
+
+from common import load_game
+
+import server
+import trail_engine
+
+game = load_game()
+
+
+# Bytes of Python memory per object that make() allocates, over n objects
+def bytes_per(make, n):
+    make()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [make() for _ in range(n)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(held) == n
+    return (after - before) / n
+
+
+def surface_bytes(surface):
+    return surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+
+def started_run(seed):
+    game_state = game.GameState(seed=seed)
+    game_state.set_character_class("Farmer")
+    game_state.difficulty = "MEDIUM"
+    game_state.travel(max_days=3)
+    return game_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report memory held per game run")
+    parser.add_argument("--sessions", type=int, default=5000)
+    args = parser.parse_args()
+    n = args.sessions
+
+    seeds = iter(range(10 * n))
+    print(f"{'per run':<40} {'bytes':>10}")
+    print(f"{'GameState (new)':<40} {bytes_per(lambda: game.GameState(seed=next(seeds)), n):>10,.0f}")
+    print(f"{'GameState (travelling)':<40} {bytes_per(lambda: started_run(next(seeds)), n):>10,.0f}")
+    print(f"{'server Session (travelling)':<40} "
+          f"{bytes_per(lambda: server.Session('bench', started_run(next(seeds))), n):>10,.0f}")
+    parties = bytes_per(lambda: trail_engine.Parties.create(1000, "Farmer", "MEDIUM"), n // 10) / 1000
+    print(f"{'simulated party (Parties of 1000)':<40} {parties:>10,.1f}")
+
+    game.get_scene(game.TRAVEL)
+    game.interactive_map.draw()
+    layers = game.get_map_layers()
+    shared = surface_bytes(layers.trail_layer) + surface_bytes(layers.base_layer)
+    shared += sum(surface_bytes(text) for _, _, text, _ in layers.markers)
+    print(f"\n{'per process':<40} {'bytes':>10}")
+    print(f"{'map layers (shared)':<40} {shared:>10,}")
+    print(f"{'TRAVEL screen map':<40} {surface_bytes(game.interactive_map.get_surface()):>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# Headless benchmark suite for the whole game
+#
+# Times a full frame of every game state, the map, log and item list widgets, hunting
+# frames, state transitions and save/load round trips, then compares each
+# case's median against benchmarks/baseline.json and exits non-zero if any
+# case got slower than the threshold allows. Baselines are machine specific:
+# record one on the machine that runs the comparison.
+#
+#   python benchmarks/bench_suite.py                     # compare with the baseline
+#   python benchmarks/bench_suite.py --update-baseline   # record a new baseline
+#   python benchmarks/bench_suite.py --only "state "     # run matching cases only
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from common import REPO_ROOT, load_game, print_header, print_row, summarize, time_calls
+
+BASELINE_FILE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+DEFAULT_THRESHOLD = 0.25  # allowed slowdown of the median, as a fraction
+NOISE_FLOOR_MS = 0.05     # differences smaller than this are never regressions
+
+STATE_NAMES = ["MAIN_MENU", "CHARACTER_CREATION", "CLASS_SELECTION", "DIFFICULTY_SELECTION", "TRAVEL", "SHOP",
+               "HIGH_SCORES", "VICTORY_SCREEN", "DEFEAT_SCREEN", "DEATH_SCREEN", "RIVER_CROSSING", "INVENTORY",
+               "CHARACTER_PROGRESS", "PROGRESS_MAP", "HUNTING"]
+
+game = load_game()
+
+
+def setup_party():
+    game.game_state.character_name = "Bench"
+    game.game_state.set_character_class("Farmer")
+    game.game_state.difficulty = "MEDIUM"
+    for _ in range(4):
+        game.game_state.update_progress()
+        game.log_display.add_log(f"Traveled to {game.game_state.get_current_location()}")
+    game.progress_bar.set_progress(game.game_state.get_progress_percentage(), game.game_state.get_current_location())
+
+
+# A full redraw of a state, as after entering it
+def state_frame(state):
+    def frame():
+        game.renderer.invalidate()
+        game.renderer.render(state, game.get_state_widgets(state))
+    return frame
+
+
+def map_draw():
+    game.get_scene(game.TRAVEL)  # Builds the map
+    interactive_map = game.interactive_map
+    interactive_map.overlay_dirty = True
+    interactive_map.draw()
+
+
+def log_draw():
+    game.log_display.draw(game.screen)
+
+
+def fill_log(lines=5000):
+    for i in range(lines):
+        game.log_display.add_log(f"Log line {i} of a long session on the trail")
+
+
+# A modded catalog much bigger than the built-in one
+def big_catalog(items=5000):
+    return game.catalog.Catalog([(f"item{i}", f"Item {i:05d}", f"Category {i % 20}", 1 + i % 50, 1 + i % 3, "units")
+                                 for i in range(items)])
+
+
+# Scroll a few rows per frame so most rows in view are new
+def item_list_scroll(big):
+    item_list = game.ItemList(270, 110, 510, 320, [5, 200, 360], lambda item_id: (big[item_id].name, f"${big[item_id].price}"))
+    item_list.set_rows(big.search())
+
+    def frame():
+        item_list.scroll_to((item_list.scroll_y + 7) % item_list.get_max_scroll())
+        item_list.draw(game.screen)
+    return frame
+
+
+def cart_checkout(big):
+    ids = list(range(0, len(big), len(big) // 100))
+
+    def checkout():
+        cart = game.catalog.Cart(big)
+        for item_id in ids:
+            cart.add(item_id, 2)
+        assert cart.checkout(game.catalog.Inventory(big), 10 ** 9) is not None
+    return checkout
+
+
+# Drag the PROGRESS_MAP map a few pixels a frame, at a level where new tiles
+# keep coming into view
+def map_pan():
+    zoomable_map = game.ZoomableMap(270, 100, 510, 390)
+    zoomable_map.zoom(3)
+    step = [4]
+
+    def frame():
+        if not 0 < zoomable_map.center[0] < game.MAP_SIZE[0]:
+            step[0] = -step[0]
+        zoomable_map.pan(step[0], 0)
+        zoomable_map.draw(game.screen)
+    return frame
+
+
+# Zoom in a level with no tiles drawn yet: the worst frame, limited by the
+# tile budget
+def map_zoom_cold():
+    zoomable_map = game.ZoomableMap(270, 100, 510, 390)
+    zoomable_map.find_party()
+    zoomable_map.draw(game.screen)
+
+    def frame():
+        tiles = zoomable_map.tiles.tiles
+        for key in [key for key in tiles if key[0] > 0]:
+            del tiles[key]
+        zoomable_map.level = 0
+        zoomable_map.zoom(4)
+        zoomable_map.draw(game.screen)
+    return frame
+
+
+def state_transitions():
+    for name in STATE_NAMES:
+        state = getattr(game, name)
+        game.set_state(state)
+        game.renderer.render(state, game.get_state_widgets(state))
+
+
+def save_load():
+    game.game_state.save_game("bench")
+    game.save_manager.flush()
+    assert game.game_state.load_game("bench")
+
+
+# Time real hunting_game frames by stamping each call the loop makes to the pacer
+def hunting_frames(frames=600):
+    samples = []
+    last = [None]
+
+    async def next_frame(idle=False, fps=None, timeout=None):
+        now = time.perf_counter()
+        if last[0] is not None:
+            samples.append((now - last[0]) * 1000)
+        last[0] = now
+        return []
+
+    real_next_frame = game.pacer.next_frame
+    game.pacer.next_frame = next_frame
+    try:
+        # One hunt is GAME_DURATION seconds of simulation; feed it 1/60 s per frame
+        while len(samples) < frames:
+            ticks = [0]
+
+            def get_ticks():
+                ticks[0] += 1000 // 60
+                return ticks[0]
+
+            real_get_ticks = game.get_ticks
+            game.get_ticks = get_ticks
+            try:
+                asyncio.run(game.hunting_game())
+            finally:
+                game.get_ticks = real_get_ticks
+            last[0] = None
+    finally:
+        game.pacer.next_frame = real_next_frame
+    return samples
+
+
+def run_cases(only=None, iterations=300):
+    setup_party()
+    fill_log()
+    cases = [(f"state {name}", state_frame(getattr(game, name))) for name in STATE_NAMES]
+    cases += [
+        ("InteractiveMap.draw", map_draw),
+        ("ZoomableMap.draw (panning)", map_pan()),
+        ("ZoomableMap.draw (zooming, cold tiles)", map_zoom_cold()),
+        ("LogDisplay.draw (full)", log_draw),
+        ("LogDisplay.add_log", lambda: game.log_display.add_log("Traveled to FORT KEARNEY (health 94, $1000)")),
+        ("set_state through every state", state_transitions),
+        ("save_game + load_game", save_load),
+    ]
+    big = big_catalog()
+    cases += [
+        ("ItemList.draw (5000 items, scrolling)", item_list_scroll(big)),
+        ("Catalog.search (5000 items)", lambda: big.search("item 01", "Category 3")),
+        ("Cart.checkout (100 of 5000 items)", cart_checkout(big)),
+    ]
+    results = {}
+    for name, func in cases:
+        if only and only not in name:
+            continue
+        results[name] = summarize(time_calls(func, iterations))
+        print_row(name, results[name])
+    if not only or only in "hunting_game frame":
+        results["hunting_game frame"] = summarize(hunting_frames())
+        print_row("hunting_game frame", results["hunting_game frame"])
+    return results
+
+
+# Cases whose median is more than threshold slower than the baseline
+def find_regressions(results, baseline, threshold):
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["p50_ms"], stats["p50_ms"]
+        if after > before * (1 + threshold) and after - before > NOISE_FLOOR_MS:
+            regressions.append((name, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every game state against a stored baseline")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--only", help="only run cases whose name contains this text")
+    args = parser.parse_args()
+
+    print_header()
+    results = run_cases(args.only, args.iterations)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    try:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    for name, before, after in regressions:
+        print(f"REGRESSION {name}: p50 {before:.3f} ms -> {after:.3f} ms ({after / before - 1:+.0%})")
+    if regressions:
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} of the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# Per-frame cost of the TRAVEL screen, before and after caching the map layers
+#
+#   python benchmarks/bench_travel_screen.py
+import pygame
+
+from common import load_game, print_header, print_row, summarize, time_calls
+
+game = load_game()
+
+
+# The map drawing code as it was before the base layer cache
+def legacy_map_draw(interactive_map):
+    interactive_map.surface.fill(game.WHITE)
+    route_points = list(interactive_map.routes.values())
+    if len(route_points) >= 2:
+        pygame.draw.lines(interactive_map.surface, game.RED, False, route_points, 3)
+    if interactive_map.progress > 0:
+        progress_points = route_points[:int(interactive_map.progress * len(route_points)) + 1]
+        if len(progress_points) >= 2:
+            pygame.draw.lines(interactive_map.surface, game.GREEN, False, progress_points, 5)
+    for location, pos in interactive_map.routes.items():
+        color = game.GREEN if location in interactive_map.reached_locations else game.BLUE
+        pygame.draw.circle(interactive_map.surface, color, pos, 5)
+        font = pygame.font.Font(None, 15)
+        text = font.render(location, True, game.BLACK)
+        text_rect = text.get_rect(center=(pos[0], pos[1] - 10))
+        interactive_map.surface.blit(text, text_rect)
+
+
+# A full TRAVEL frame as the main loop drew it before the retained renderer
+def legacy_travel_frame():
+    screen = game.screen
+    screen.fill(game.PRAIRIE_GREEN)
+    pygame.draw.rect(screen, game.SKY_BLUE, (0, 0, game.WIDTH, game.HEIGHT // 2))
+    title = game.title_font.render("Map of the Oregon Trail", True, game.BLACK)
+    screen.blit(title, (game.WIDTH // 2 - title.get_width() // 2, 50))
+    legacy_map_draw(game.interactive_map)
+    map_panel = game.get_state_widgets(game.TRAVEL)[0]
+    screen.blit(game.interactive_map.get_surface(), map_panel.rect)
+    for button in game.current_buttons:
+        pygame.draw.rect(screen, button.color, button.rect)
+        pygame.draw.rect(screen, game.BLACK, button.rect, 2)
+        text_surf = button.font.render(button.text, True, button.text_color)
+        screen.blit(text_surf, text_surf.get_rect(center=button.rect.center))
+    pygame.draw.rect(screen, game.WHITE, game.log_display.rect)
+    pygame.draw.rect(screen, game.BLACK, game.log_display.rect, 2)
+    for i, (_, _, log) in enumerate(list(game.log_display.entries)[-5:]):
+        screen.blit(game.small_font.render(log, True, game.BLACK), (game.log_display.rect.x + 5, game.log_display.rect.y + 5 + i * 20))
+    game.progress_bar.draw(screen)
+    pygame.display.flip()
+
+
+def travel_frame():
+    game.renderer.render(game.TRAVEL, game.get_state_widgets(game.TRAVEL))
+
+
+def travel_frame_after_step():
+    game.interactive_map.update_progress(game.interactive_map.progress)
+    travel_frame()
+
+
+def main():
+    game.set_state(game.TRAVEL)
+    for _ in range(4):
+        game.game_state.update_progress()
+        game.log_display.add_log(f"Traveled to {game.game_state.get_current_location()}")
+    game.progress_bar.set_progress(game.game_state.get_progress_percentage(), game.game_state.get_current_location())
+    game.interactive_map.set_progress(game.game_state.get_map_progress())
+    interactive_map = game.interactive_map
+
+    # The cached layers must produce exactly the same image as the old code
+    interactive_map.overlay_dirty = True
+    interactive_map.draw()
+    cached = interactive_map.get_surface().copy()
+    legacy_map_draw(interactive_map)
+    assert pygame.image.tobytes(cached, "RGB") == pygame.image.tobytes(interactive_map.get_surface(), "RGB")
+
+    def cached_map_draw():
+        interactive_map.overlay_dirty = True
+        interactive_map.draw()
+
+    print_header()
+    print_row("InteractiveMap.draw (before)", summarize(time_calls(lambda: legacy_map_draw(interactive_map))))
+    print_row("InteractiveMap.draw (after, progress)", summarize(time_calls(cached_map_draw)))
+    print_row("InteractiveMap.draw (after, unchanged)", summarize(time_calls(interactive_map.draw)))
+    print_row("TRAVEL frame (before)", summarize(time_calls(legacy_travel_frame)))
+    game.renderer.invalidate()
+    print_row("TRAVEL frame (after, static)", summarize(time_calls(travel_frame)))
+    print_row("TRAVEL frame (after, progress step)", summarize(time_calls(travel_frame_after_step)))
+
+
+if __name__ == "__main__":
+    main()
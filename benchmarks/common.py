@@ -0,0 +1,58 @@
+# Shared helpers for the benchmark scripts
+import importlib.util
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAME_FILE = os.path.join(REPO_ROOT, "Team A's Interface - Claude Test - V13 - Long code.py")
+
+# The game imports its sibling modules (trail_engine, ...) from the repo root
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+# Import the game script as a module and bring up a dummy display, as main()
+# would, without opening a real window. The game then runs in a scratch
+# directory, so saves, high scores and the log history never touch the player's.
+def load_game():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.chdir(tempfile.mkdtemp(prefix="oregon-bench-"))
+    spec = importlib.util.spec_from_file_location("oregon_trail", GAME_FILE)
+    game = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(game)
+    game.init_display()
+    game.set_state(game.MAIN_MENU)
+    return game
+
+
+# Time func over a number of iterations and return per-call times in milliseconds
+def time_calls(func, iterations=500, warmup=20):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "mean_ms": statistics.fmean(ordered),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        "ops_per_sec": 1000 / statistics.fmean(ordered) if ordered else 0.0,
+    }
+
+
+def print_row(name, stats):
+    print(f"{name:<40} {stats['mean_ms']:>9.3f} {stats['p50_ms']:>9.3f} {stats['p99_ms']:>9.3f} {stats['ops_per_sec']:>11.0f}")
+
+
+def print_header():
+    print(f"{'benchmark':<40} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'ops/sec':>11}")
@@ -0,0 +1,158 @@
+# Load test for the headless game server
+#
+#   python benchmarks/load_test.py --sessions 200 --think 0.5 --duration 20
+#
+# Starts a server on a free port (or uses --port), then plays that many
+# sessions at once, each like a player who acts every --think seconds: pick a
+# class and difficulty, then travel a day at a time with the odd hunt, purchase
+# and save, starting a new run when the party dies or reaches Oregon.
+#
+# Reports the latency of every action as the client saw it, and how much of a
+# core the server used, from which it works out how many sessions of that kind
+# one core could hold. The clients run in a single process of their own, so on
+# a busy machine --think 0 measures the clients as much as the server.
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import REPO_ROOT, summarize
+
+import trail_engine
+
+SERVER = os.path.join(REPO_ROOT, "server.py")
+CLASSES = trail_engine.CLASSES[1:]
+DIFFICULTIES = trail_engine.DIFFICULTIES[1:]
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+
+    @classmethod
+    async def connect(cls, host, port):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def send(self, action, **fields):
+        self.next_id += 1
+        self.writer.write(json.dumps(dict(fields, id=self.next_id, action=action)).encode() + b"\n")
+        await self.writer.drain()
+        reply = json.loads(await self.reader.readline())
+        if reply.get("id") != self.next_id:
+            raise RuntimeError(f"reply {reply.get('id')} to request {self.next_id}")
+        return reply
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+# One player, acting until stop; appends each action's latency in ms
+async def play(host, port, number, think, stop, latencies, counts):
+    client = await Client.connect(host, port)
+    rng = random.Random(number)
+    run = 0
+    # Spread the players out so they don't all act on the same tick
+    await asyncio.sleep(rng.random() * think)
+    while time.perf_counter() < stop:
+        run += 1
+        session = f"load-{number}-{run}"
+        actions = [("open", {"session": session, "seed": number * 1000 + run}),
+                   ("class", {"value": rng.choice(CLASSES)}),
+                   ("difficulty", {"value": rng.choice(DIFFICULTIES)})]
+        status = "travelling"
+        while time.perf_counter() < stop and status == "travelling":
+            if not actions:
+                roll = rng.random()
+                if roll < 0.1:
+                    actions.append(("hunt", {"score": rng.randrange(10)}))
+                elif roll < 0.15:
+                    actions.append(("buy", {"items": {"food": 1}}))
+                elif roll < 0.2:
+                    actions.append(("save", {}))
+                else:
+                    actions.append(("travel", {"days": 1}))
+            action, fields = actions.pop(0)
+            start = time.perf_counter()
+            reply = await client.send(action, **fields)
+            latencies.append((time.perf_counter() - start) * 1000)
+            counts[action] = counts.get(action, 0) + 1
+            if not reply["ok"]:
+                counts["errors"] = counts.get("errors", 0) + 1
+            status = reply.get("diff", reply.get("state", {})).get("status", status)
+            await asyncio.sleep(think)
+        counts["runs"] = counts.get("runs", 0) + 1
+    await client.close()
+
+
+async def run_load(host, port, sessions, think, duration):
+    monitor = await Client.connect(host, port)
+    before = (await monitor.send("stats"))
+    latencies, counts = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(play(host, port, number, think, start + duration, latencies, counts)
+                           for number in range(sessions)))
+    elapsed = time.perf_counter() - start
+    after = (await monitor.send("stats"))
+    await monitor.close()
+    return latencies, counts, elapsed, after["cpu_seconds"] - before["cpu_seconds"], after
+
+
+# Start server.py on a free port and wait for it to say where it listens
+def start_server(saves, idle):
+    process = subprocess.Popen([sys.executable, SERVER, "--port", "0", "--saves", saves, "--idle", str(idle)],
+                               stdout=subprocess.PIPE, text=True)
+    # pygame prints a banner first
+    for line in process.stdout:
+        if line.startswith("Listening on "):
+            break
+    else:
+        process.wait()
+        raise RuntimeError("server did not start")
+    host, port = line.split()[-1].rsplit(":", 1)
+    return process, host, int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the headless game server")
+    parser.add_argument("--sessions", type=int, default=200, help="concurrent players")
+    parser.add_argument("--think", type=float, default=0.5, help="seconds each player waits between actions")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds to run for")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="use a running server instead of starting one")
+    parser.add_argument("--idle", type=float, default=10.0, help="idle timeout for the server this starts")
+    args = parser.parse_args()
+
+    process = None
+    host, port = args.host, args.port
+    if port is None:
+        process, host, port = start_server(tempfile.mkdtemp(prefix="oregon-server-"), args.idle)
+    try:
+        latencies, counts, elapsed, cpu, stats = asyncio.run(
+            run_load(host, port, args.sessions, args.think, args.duration))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    stats_row = summarize(latencies)
+    busy = cpu / elapsed
+    print(f"{args.sessions} sessions acting every {args.think}s for {elapsed:.1f}s")
+    print(f"actions: {len(latencies)} ({len(latencies) / elapsed:,.0f}/s), runs: {counts.get('runs', 0)}, "
+          f"errors: {counts.get('errors', 0)}, evictions: {stats['evictions']}")
+    print(f"latency: mean {stats_row['mean_ms']:.2f} ms, p50 {stats_row['p50_ms']:.2f} ms, "
+          f"p99 {stats_row['p99_ms']:.2f} ms")
+    print(f"server CPU: {busy:.1%} of a core, {cpu / len(latencies) * 1e6:.0f} us per action")
+    if busy:
+        print(f"sessions per core at this pace: {args.sessions / busy:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+# Game content: the trail, classes, difficulties, shop items and help text
+#
+# Content lives in JSON files in the data directory (or the one named by the
+# OREGON_CONTENT environment variable, for a content pack), so it can be
+# changed without touching the code. Loading checks every record and stops on
+# the first problem with a ContentError naming the file and the field.
+#
+# Parsing and checking a large pack takes a while, so the checked content is
+# compiled into a cache (marshal, in the data directory's __pycache__) along
+# with each file's mtime, size and SHA-256. A normal start only stats the
+# files and reads the cache. When a file's mtime or size changed but its hash
+# didn't (a checkout, a touch) the cache is kept and only its stats updated.
+#
+# While the game runs with --watch-content, a ContentWatcher polls the files
+# and hands back new content whenever one of them is saved.
+import hashlib
+import json
+import marshal
+import os
+import sys
+import time
+
+from savegames import write_atomic
+
+CONTENT_DIR = os.environ.get("OREGON_CONTENT") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CACHE_DIR = "__pycache__"
+CACHE_FILE = "content.bin"
+CACHE_VERSION = 3
+MAP_SIZE = (510, 380)    # landmark positions are on the TRAVEL screen's map
+SCREEN_SIZE = (800, 600)  # button layouts are on the screen
+POLL_INTERVAL = 0.5      # seconds between checks for changed files
+REQUIRED_ITEMS = ["food"]  # items the rules use by key, which every pack must have
+
+loaded = None  # The content in use, loaded on first get()
+
+
+class ContentError(ValueError):
+    pass
+
+
+# Name of a field for messages: "items.json: items" or "items.json: items[2].price"
+def field_name(where, key):
+    return f"{where}: {key}" if where.endswith(".json") else f"{where}.{key}"
+
+
+# Checks for one field of a record; where says which record, for the message
+def get_field(record, key, kind, where, default=None):
+    value = record.get(key, default) if isinstance(record, dict) else None
+    if kind is float and isinstance(value, int) and not isinstance(value, bool):
+        value = float(value)
+    if not isinstance(value, kind) or isinstance(value, bool):
+        names = {str: "text", int: "a whole number", float: "a number", list: "a list", dict: "an object"}
+        raise ContentError(f"{field_name(where, key)} must be {names[kind]}")
+    return value
+
+
+def get_number(record, key, where, default=None, minimum=0.0):
+    value = get_field(record, key, float, where, default)
+    if value < minimum:
+        raise ContentError(f"{field_name(where, key)} must be at least {minimum:g}")
+    return value
+
+
+def get_list(document, key, where, minimum=1):
+    records = get_field(document, key, list, where)
+    if len(records) < minimum:
+        raise ContentError(f"{field_name(where, key)} needs at least {minimum} entr{'y' if minimum == 1 else 'ies'}")
+    return records
+
+
+def check_unique(records, key, where):
+    seen = set()
+    for i, record in enumerate(records):
+        if record[key] in seen:
+            raise ContentError(f"{where}[{i}].{key} {record[key]!r} is used twice")
+        seen.add(record[key])
+
+
+# Where a list of buttons goes: the first one's rect and the step down to the next
+def check_layout(document, where, count):
+    layout = get_field(document, "layout", dict, where)
+    where = field_name(where, "layout")
+    layout = {key: get_field(layout, key, int, where) for key in ("x", "y", "width", "height", "spacing")}
+    bottom = layout["y"] + (count - 1) * layout["spacing"] + layout["height"]
+    if min(layout.values()) < 0 or layout["x"] + layout["width"] > SCREEN_SIZE[0] or bottom > SCREEN_SIZE[1]:
+        raise ContentError(f"{where} puts buttons off the screen")
+    return layout
+
+
+def check_trail(document):
+    landmarks = []
+    for i, record in enumerate(get_list(document, "landmarks", "trail.json", minimum=2)):
+        where = f"trail.json: landmarks[{i}]"
+        landmark = {
+            "name": get_field(record, "name", str, where),
+            "x": get_field(record, "x", int, where),
+            "y": get_field(record, "y", int, where),
+            "miles": get_field(record, "miles", int, where),
+            # Name of the stretch of trail that starts here, if one does
+            "segment": get_field(record, "segment", str, where) if "segment" in record else None,
+        }
+        if not (0 <= landmark["x"] < MAP_SIZE[0] and 0 <= landmark["y"] < MAP_SIZE[1]):
+            raise ContentError(f"{where} is off the {MAP_SIZE[0]}x{MAP_SIZE[1]} map")
+        if landmarks and landmark["miles"] <= landmarks[-1]["miles"]:
+            raise ContentError(f"{where}.miles must be further than the landmark before it")
+        landmarks.append(landmark)
+    if landmarks[0]["miles"] != 0:
+        raise ContentError("trail.json: landmarks[0].miles must be 0, the start")
+    if landmarks[0]["segment"] is None:
+        raise ContentError("trail.json: landmarks[0].segment must name the first stretch of trail")
+    check_unique(landmarks, "name", "trail.json: landmarks")
+    return {"landmarks": landmarks}
+
+
+def check_classes(document):
+    classes = []
+    for i, record in enumerate(get_list(document, "classes", "classes.json")):
+        where = f"classes.json: classes[{i}]"
+        events = get_field(record, "events", dict, where, {})
+        classes.append({
+            "id": get_field(record, "id", str, where),
+            "description": get_field(record, "description", str, where),
+            "money": get_number(record, "money", where, 1.0),
+            "forage": get_number(record, "forage", where, 1.0),
+            "hunting": get_number(record, "hunting", where, 1.0),
+            "events": {event: get_number(events, event, f"{where}.events") for event in events},
+        })
+    check_unique(classes, "id", "classes.json: classes")
+    return {"classes": classes, "class_layout": check_layout(document, "classes.json", len(classes))}
+
+
+def check_difficulties(document):
+    difficulties = []
+    for i, record in enumerate(get_list(document, "difficulties", "difficulties.json")):
+        where = f"difficulties.json: difficulties[{i}]"
+        color = get_field(record, "color", list, where)
+        if len(color) != 3 or not all(isinstance(c, int) and 0 <= c <= 255 for c in color):
+            raise ContentError(f"{where}.color must be three values from 0 to 255")
+        difficulties.append({
+            "id": get_field(record, "id", str, where),
+            "color": color,
+            "damage": get_number(record, "damage", where, 1.0),
+            "hazard": get_number(record, "hazard", where, 1.0),
+            "score": get_number(record, "score", where, 1.0),
+        })
+    check_unique(difficulties, "id", "difficulties.json: difficulties")
+    return {"difficulties": difficulties,
+            "difficulty_layout": check_layout(document, "difficulties.json", len(difficulties))}
+
+
+def check_items(document):
+    items = []
+    for i, record in enumerate(get_list(document, "items", "items.json")):
+        where = f"items.json: items[{i}]"
+        item = {key: get_field(record, key, str, where) for key in ("key", "name", "category", "unit")}
+        for key in ("price", "pack"):
+            item[key] = get_field(record, key, int, where)
+            if item[key] < 1:
+                raise ContentError(f"{where}.{key} must be at least 1")
+        items.append(item)
+    check_unique(items, "key", "items.json: items")
+    keys = {item["key"] for item in items}
+    for key in REQUIRED_ITEMS:
+        if key not in keys:
+            raise ContentError(f"items.json: items needs an item with key {key!r}, which the game uses")
+    return {"items": items}
+
+
+def check_text(document):
+    lines = get_list(document, "help", "text.json", minimum=0)
+    for i, line in enumerate(lines):
+        if not isinstance(line, str):
+            raise ContentError(f"text.json: help[{i}] must be text")
+    return {"help": lines}
+
+
+# Each content file and the check that turns it into content
+FILES = {
+    "trail.json": check_trail,
+    "classes.json": check_classes,
+    "difficulties.json": check_difficulties,
+    "items.json": check_items,
+    "text.json": check_text,
+}
+
+
+# (mtime_ns, size) of each content file
+def get_stats(directory):
+    stats = {}
+    for name in FILES:
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except FileNotFoundError:
+            raise ContentError(f"{name} is missing from {directory}") from None
+        stats[name] = [stat.st_mtime_ns, stat.st_size]
+    return stats
+
+
+def hash_file(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# Parse and check every file; returns the content and each file's hash
+def compile_content(directory):
+    data, hashes = {}, {}
+    for name, check in FILES.items():
+        try:
+            with open(os.path.join(directory, name), "rb") as f:
+                raw = f.read()
+        except OSError as e:
+            raise ContentError(f"{name} can't be read: {e.strerror}") from None
+        hashes[name] = hashlib.sha256(raw).hexdigest()
+        try:
+            document = json.loads(raw)
+        except ValueError as e:
+            raise ContentError(f"{name}: {e}") from None
+        if not isinstance(document, dict):
+            raise ContentError(f"{name} must hold a JSON object")
+        data.update(check(document))
+    return data, hashes
+
+
+def get_cache_path(directory):
+    return os.path.join(directory, CACHE_DIR, CACHE_FILE)
+
+
+# The cache, or None if there isn't a usable one. marshal's format changes
+# between Python versions, so the cache records which one wrote it.
+def read_cache(path):
+    try:
+        with open(path, "rb") as f:
+            cache = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(cache, dict) or cache.get("version") != [CACHE_VERSION, *sys.version_info[:2]]:
+        return None
+    return cache
+
+
+def write_cache(path, data, stats, hashes):
+    files = {name: stats[name] + [hashes[name]] for name in FILES}
+    cache = {"version": [CACHE_VERSION, *sys.version_info[:2]], "files": files, "content": data}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, marshal.dumps(cache))
+    except OSError:
+        pass  # A read-only install just compiles on every start
+
+
+# The content in directory, from the cache when the files haven't changed
+def load(directory=CONTENT_DIR):
+    # Stat before reading, so a file saved while loading is seen as changed next time
+    stats = get_stats(directory)
+    cache_path = get_cache_path(directory)
+    cache = read_cache(cache_path)
+    if cache is not None:
+        files = cache["files"]
+        if all(files.get(name, [])[:2] == stat for name, stat in stats.items()):
+            return cache["content"]
+        hashes = {name: hash_file(os.path.join(directory, name)) for name in FILES}
+        if all(files.get(name, [None] * 3)[2] == hashes[name] for name in FILES):
+            write_cache(cache_path, cache["content"], stats, hashes)
+            return cache["content"]
+    data, hashes = compile_content(directory)
+    write_cache(cache_path, data, stats, hashes)
+    return data
+
+
+def get():
+    global loaded
+    if loaded is None:
+        loaded = load()
+    return loaded
+
+
+class ContentWatcher:
+    def __init__(self, directory=CONTENT_DIR, interval=POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.stats = get_stats(directory)
+        self.next_check = time.monotonic() + interval
+
+    # New content if a file changed since the last check, else None. Raises
+    # ContentError if the changed files don't check out. Whoever puts the new
+    # content to use sets loaded, so get() returns it from then on.
+    def poll(self):
+        now = time.monotonic()
+        if now < self.next_check:
+            return None
+        self.next_check = now + self.interval
+        try:
+            stats = get_stats(self.directory)
+        except ContentError:
+            return None  # Editors may swap a file out while saving; look again next time
+        if stats == self.stats:
+            return None
+        self.stats = stats
+        return load(self.directory)
+
+
+def main():
+    start = time.perf_counter()
+    data = load()
+    elapsed = time.perf_counter() - start
+    print(f"{len(data['landmarks'])} landmarks, {len(data['classes'])} classes, "
+          f"{len(data['difficulties'])} difficulties, {len(data['items'])} items from {CONTENT_DIR} "
+          f"in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ContentError as e:
+        sys.exit(f"Content error: {e}")
@@ -0,0 +1,47 @@
+# Game log history
+#
+# The on-screen log keeps only the most recent lines in memory. Every line is
+# also appended to saves/game.log, which rotates to game.log.1 ... game.log.N
+# once it reaches MAX_BYTES, so the full history of a long session stays on
+# disk without any one file growing forever.
+import logging
+import logging.handlers
+import os
+
+from savegames import SAVE_DIR
+
+LOG_FILE = "game.log"
+MAX_BYTES = 256 * 1024
+BACKUP_COUNT = 4
+
+
+class LogHistory:
+    def __init__(self, directory=SAVE_DIR, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+        self.path = os.path.join(directory, LOG_FILE)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.handler = None  # The file is opened on the first append
+
+    def append(self, timestamp, message):
+        if self.handler is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.handler = logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8")
+        line = f"{timestamp:%Y-%m-%d %H:%M:%S}  {message}"
+        self.handler.handle(logging.makeLogRecord({"msg": line}))
+
+    # Every line still on disk, oldest first
+    def read(self):
+        paths = [f"{self.path}.{i}" for i in range(self.backup_count, 0, -1)] + [self.path]
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        yield line.rstrip("\n")
+            except FileNotFoundError:
+                continue
+
+    def close(self):
+        if self.handler is not None:
+            self.handler.close()
+            self.handler = None
@@ -0,0 +1,127 @@
+# High scores
+#
+# Finished runs go into a local SQLite table indexed by difficulty and class.
+# The screen only ever asks for the best K runs of one filter (everything, a
+# difficulty, a class, or both); each filter's top K is loaded once through an
+# index with LIMIT and then kept current in an in-memory min-heap as new runs
+# come in, so no query ever scans the table however many runs a kiosk has.
+import heapq
+import os
+import sqlite3
+from datetime import datetime
+
+import content
+from savegames import SAVE_DIR
+
+DB_FILE = "highscores.db"
+TOP_K = 100
+
+# Final score: what the party arrived with, scaled by how hard the trail was
+HEALTH_POINTS = 10
+FOOD_POINTS = 2
+
+
+# Each difficulty's score multiplier comes from difficulties.json
+def apply_content(data):
+    global DIFFICULTY_MULTIPLIER
+    DIFFICULTY_MULTIPLIER = {"": 1.0, **{record["id"]: record["score"] for record in data["difficulties"]}}
+
+
+apply_content(content.get())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    character_class TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    health INTEGER NOT NULL,
+    money INTEGER NOT NULL,
+    finished_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_score ON runs (score DESC, id);
+CREATE INDEX IF NOT EXISTS runs_by_difficulty ON runs (difficulty, score DESC, id);
+CREATE INDEX IF NOT EXISTS runs_by_class ON runs (character_class, score DESC, id);
+CREATE INDEX IF NOT EXISTS runs_by_difficulty_class ON runs (difficulty, character_class, score DESC, id);
+"""
+COLUMNS = "id, name, character_class, difficulty, score, health, money, finished_at"
+
+
+def score_run(health, money, food, difficulty):
+    points = health * HEALTH_POINTS + money + food * FOOD_POINTS
+    return int(points * DIFFICULTY_MULTIPLIER.get(difficulty, 1.0))
+
+
+class HighScores:
+    def __init__(self, directory=SAVE_DIR, k=TOP_K):
+        self.directory = directory
+        self._connection = None  # Opened on first use
+        self.k = k
+        # (difficulty, character_class) -> min-heap of (score, -id, row); None matches anything
+        self.heaps = {}
+        self.version = 0  # Bumped whenever a cached top K changes
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._connection = sqlite3.connect(os.path.join(self.directory, DB_FILE))
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    # Record a finished run and return its score
+    def add_run(self, name, character_class, difficulty, health, money, food):
+        score = score_run(health, money, food, difficulty)
+        finished_at = datetime.now().isoformat(timespec="seconds")
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (name, character_class, difficulty, score, health, money, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name or "Anonymous", character_class, difficulty, score, health, money, finished_at))
+        row = (cursor.lastrowid, name or "Anonymous", character_class, difficulty, score, health, money, finished_at)
+        for key, heap in self.heaps.items():
+            if key[0] in (None, difficulty) and key[1] in (None, character_class):
+                self.push(heap, row)
+        self.version += 1
+        return score
+
+    def push(self, heap, row):
+        entry = (row[4], -row[0], row)
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    # Load a filter's top K through its index
+    def load_heap(self, difficulty, character_class):
+        where, params = [], []
+        if difficulty is not None:
+            where.append("difficulty = ?")
+            params.append(difficulty)
+        if character_class is not None:
+            where.append("character_class = ?")
+            params.append(character_class)
+        query = f"SELECT {COLUMNS} FROM runs"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY score DESC, id LIMIT ?"
+        heap = [(row[4], -row[0], row) for row in self.connection.execute(query, params + [self.k])]
+        heapq.heapify(heap)
+        return heap
+
+    # Best runs for a filter, highest score first (ties go to the earlier run)
+    def top(self, difficulty=None, character_class=None, limit=None):
+        key = (difficulty, character_class)
+        heap = self.heaps.get(key)
+        if heap is None:
+            heap = self.heaps[key] = self.load_heap(difficulty, character_class)
+        return [entry[2] for entry in heapq.nlargest(limit or self.k, heap)]
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,159 @@
+# Hunting mini-game simulation
+#
+# Animals are held in NumPy arrays (position, velocity, alive) and the whole
+# herd moves in one vectorized step at a fixed SIM_HZ, independent of how fast
+# the game happens to render. Shots are a vectorized point-in-rect test.
+# Nothing here needs pygame, so the mini-game can be benchmarked and
+# soak-tested headless:
+#
+#   python hunting.py --animals 200 --seconds 600
+import argparse
+import time
+
+import numpy as np
+
+import content
+
+SIM_HZ = 120
+DT = 1.0 / SIM_HZ
+MAX_STEPS_PER_ADVANCE = 30  # don't try to catch up more than a quarter second
+
+GAME_DURATION = 10.0        # seconds of simulated time per hunt
+ANIMAL_WIDTH, ANIMAL_HEIGHT = 50, 50
+MIN_SPEED, MAX_SPEED = 150.0, 400.0  # pixels per second
+START_ANIMALS = 3
+SPAWN_RATE = 0.6            # new animals per second
+MAX_ANIMALS = 12
+
+
+# How much more often game shows up for each class (classes.json "hunting";
+# Farmers are better at hunting and gathering)
+def apply_content(data):
+    global CLASS_SPAWN_RATE
+    CLASS_SPAWN_RATE = {record["id"]: record["hunting"] for record in data["classes"]}
+
+
+apply_content(content.get())
+
+
+class HuntingEngine:
+    def __init__(self, width, height, character_class="", seed=None, max_animals=MAX_ANIMALS,
+                 start_animals=START_ANIMALS, spawn_rate=SPAWN_RATE, duration=GAME_DURATION):
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        self.duration = duration
+        self.spawn_rate = spawn_rate * CLASS_SPAWN_RATE.get(character_class, 1.0)
+        self.size = np.array([ANIMAL_WIDTH, ANIMAL_HEIGHT], dtype=np.float64)
+        # Animals roam the prairie, below the sky line
+        self.low = np.array([0.0, height / 2], dtype=np.float64)
+        self.high = np.array([width, height - 40], dtype=np.float64) - self.size
+
+        self.pos = np.zeros((max_animals, 2))
+        self.prev_pos = np.zeros((max_animals, 2))
+        self.vel = np.zeros((max_animals, 2))
+        self.alive = np.zeros(max_animals, dtype=bool)
+        self.time = 0.0
+        self.accumulator = 0.0
+        self.spawn_credit = 0.0
+        self.score = 0
+        self.shots = 0
+        self.spawn(start_animals)
+
+    def is_over(self):
+        return self.time >= self.duration
+
+    def time_left(self):
+        return max(0.0, self.duration - self.time)
+
+    def spawn(self, count):
+        free = np.flatnonzero(~self.alive)[:count]
+        n = len(free)
+        if n == 0:
+            return
+        self.pos[free] = self.low + self.rng.random((n, 2)) * (self.high - self.low)
+        self.prev_pos[free] = self.pos[free]
+        speed = MIN_SPEED + self.rng.random(n) * (MAX_SPEED - MIN_SPEED)
+        # Mostly sideways, like the original deer, with a little drift
+        angle = self.rng.uniform(-0.3, 0.3, n) + np.pi * self.rng.integers(0, 2, n)
+        self.vel[free, 0] = speed * np.cos(angle)
+        self.vel[free, 1] = speed * np.sin(angle)
+        self.alive[free] = True
+
+    # One fixed simulation step for the whole herd
+    def step(self):
+        self.prev_pos[:] = self.pos
+        self.pos += self.vel * DT
+        # Bounce off the edges of the field
+        under = self.pos < self.low
+        over = self.pos > self.high
+        self.vel[under] = np.abs(self.vel[under])
+        self.vel[over] = -np.abs(self.vel[over])
+        np.clip(self.pos, self.low, self.high, out=self.pos)
+
+        self.spawn_credit += self.spawn_rate * DT
+        if self.spawn_credit >= 1.0:
+            count = int(self.spawn_credit)
+            self.spawn_credit -= count
+            self.spawn(count)
+        self.time += DT
+
+    # Run as many fixed steps as elapsed seconds cover. Returns how far (0-1)
+    # the leftover time is into the next step, for interpolating the drawing.
+    def advance(self, elapsed):
+        self.accumulator = min(self.accumulator + elapsed, MAX_STEPS_PER_ADVANCE * DT)
+        while self.accumulator >= DT and not self.is_over():
+            self.step()
+            self.accumulator -= DT
+        return self.accumulator / DT
+
+    # Positions to draw, blended between the last two steps
+    def get_draw_positions(self, alpha):
+        index = np.flatnonzero(self.alive)
+        return self.prev_pos[index] + (self.pos[index] - self.prev_pos[index]) * alpha
+
+    # Fire at a point; the animal drawn on top is hit first. Returns True on a hit.
+    def shoot(self, x, y):
+        self.shots += 1
+        inside = self.alive & (x >= self.pos[:, 0]) & (x < self.pos[:, 0] + self.size[0]) & \
+            (y >= self.pos[:, 1]) & (y < self.pos[:, 1] + self.size[1])
+        hits = np.flatnonzero(inside)
+        if len(hits) == 0:
+            return False
+        self.alive[hits[-1]] = False
+        self.score += 1
+        return True
+
+
+# Headless benchmark / soak test: run the simulation flat out with random shots
+def main():
+    parser = argparse.ArgumentParser(description="Run the hunting mini-game headless")
+    parser.add_argument("--animals", type=int, default=200, help="herd size")
+    parser.add_argument("--seconds", type=float, default=600.0, help="simulated seconds")
+    parser.add_argument("--shots-per-second", type=float, default=5.0)
+    parser.add_argument("--character-class", default="")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engine = HuntingEngine(800, 600, args.character_class, args.seed, max_animals=args.animals,
+                           start_animals=args.animals, spawn_rate=args.animals / 10, duration=args.seconds)
+    shot_rng = np.random.default_rng(args.seed + 1)
+    shot_every = int(SIM_HZ / args.shots_per_second) if args.shots_per_second > 0 else 0
+    steps = 0
+    start = time.perf_counter()
+    while not engine.is_over():
+        engine.step()
+        steps += 1
+        if shot_every and steps % shot_every == 0:
+            engine.shoot(*(shot_rng.random(2) * (engine.width, engine.height)))
+        assert np.all(engine.pos[engine.alive] >= engine.low - 1e-6)
+        assert np.all(engine.pos[engine.alive] <= engine.high + 1e-6)
+    elapsed = time.perf_counter() - start
+
+    print(f"{steps} steps of {args.animals} animals in {elapsed:.2f}s "
+          f"({steps / elapsed:,.0f} steps/s, {steps / elapsed / SIM_HZ:,.0f}x real time)")
+    print(f"score {engine.score} from {engine.shots} shots, {int(engine.alive.sum())} animals alive at the end")
+
+
+if __name__ == "__main__":
+    main()
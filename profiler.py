@@ -0,0 +1,125 @@
+# Frame profiler
+#
+# Loops call start_frame() once per frame and mark(phase) after each phase;
+# the time since the previous mark is charged to that phase. Finished frames
+# are kept in a short window for the on-screen HUD and can be streamed to a
+# CSV (one row per phase) or JSONL (one object per frame) file. While the
+# profiler is disabled every call returns straight away.
+#
+#   OREGON_PROFILE=1 OREGON_PROFILE_OUT=frames.jsonl python "Team A's Interface ...py"
+import json
+import os
+import time
+from collections import deque
+
+WINDOW = 300  # frames kept for the HUD statistics
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Profiler:
+    def __init__(self, enabled=False, output=None, window=WINDOW):
+        self.enabled = enabled
+        self.output = output
+        self.output_file = None
+        self.frames = deque(maxlen=window)
+        self.frame_count = 0
+        self.loop = None
+        self.state = None
+        self.frame_start = None
+        self.last = None
+        self.phases = {}
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get("OREGON_PROFILE", "") not in ("", "0"), os.environ.get("OREGON_PROFILE_OUT"))
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        # Don't count the gap while disabled as one long frame
+        self.frame_start = None
+        if not self.enabled:
+            self.close()
+
+    # Finish the previous frame and start timing a new one of the given loop
+    def start_frame(self, loop, state=None):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.end_frame(now)
+        self.loop = loop
+        self.state = state
+        self.frame_start = self.last = now
+        self.phases = {}
+
+    # Charge the time since the last mark to phase
+    def mark(self, phase):
+        if not self.enabled or self.frame_start is None:
+            return
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self.last) * 1000
+        self.last = now
+
+    # Record a nested timing in milliseconds, e.g. one widget inside the draw
+    # phase ("draw MapPanel"); it is also still counted in the enclosing phase
+    def add(self, phase, ms):
+        if self.enabled and self.frame_start is not None:
+            self.phases[phase] = self.phases.get(phase, 0.0) + ms
+
+    def end_frame(self, now):
+        frame_ms = (now - self.frame_start) * 1000
+        # Time spent waiting for the next frame isn't work
+        busy_ms = frame_ms - self.phases.get("wait", 0.0)
+        self.frame_count += 1
+        self.frames.append((frame_ms, busy_ms, self.phases))
+        if self.output:
+            self.write_frame(frame_ms, busy_ms)
+
+    def write_frame(self, frame_ms, busy_ms):
+        csv = self.output.endswith(".csv")
+        if self.output_file is None:
+            self.output_file = open(self.output, "a")
+            if csv and self.output_file.tell() == 0:
+                self.output_file.write("frame,loop,state,phase,ms\n")
+        prefix = f"{self.frame_count},{self.loop},{self.state},"
+        if csv:
+            lines = [f"{prefix}frame,{frame_ms:.4f}\n", f"{prefix}busy,{busy_ms:.4f}\n"]
+            lines.extend(f"{prefix}{phase},{ms:.4f}\n" for phase, ms in self.phases.items())
+            self.output_file.write("".join(lines))
+        else:
+            record = {"frame": self.frame_count, "loop": self.loop, "state": self.state,
+                      "frame_ms": round(frame_ms, 4), "busy_ms": round(busy_ms, 4),
+                      "phases": {phase: round(ms, 4) for phase, ms in self.phases.items()}}
+            self.output_file.write(json.dumps(record) + "\n")
+
+    # FPS, frame time percentiles and mean time per phase over the window
+    def get_stats(self):
+        frames = list(self.frames)
+        if not frames:
+            return None
+        frame_times = sorted(frame[0] for frame in frames)
+        busy_times = sorted(frame[1] for frame in frames)
+        total_ms = sum(frame_times)
+        phases = {}
+        for _, _, frame_phases in frames:
+            for phase, ms in frame_phases.items():
+                phases[phase] = phases.get(phase, 0.0) + ms
+        return {
+            "fps": len(frames) / total_ms * 1000 if total_ms else 0.0,
+            "frame_p50": percentile(frame_times, 0.5),
+            "frame_p95": percentile(frame_times, 0.95),
+            "frame_p99": percentile(frame_times, 0.99),
+            "busy_p50": percentile(busy_times, 0.5),
+            "busy_p99": percentile(busy_times, 0.99),
+            "phases": {phase: ms / len(frames) for phase, ms in sorted(phases.items(), key=lambda item: -item[1])},
+        }
+
+    def close(self):
+        if self.output_file is not None:
+            self.output_file.close()
+            self.output_file = None
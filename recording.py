@@ -0,0 +1,198 @@
+# Session recording
+#
+# A recording holds the input of one play session frame by frame: the events
+# each frame received, how much time passed and where the mouse was, plus the
+# seed the run's dice came from and the save files there were when it started
+# (so a session that begins with CONTINUE finds the same saves). Played back,
+# the game gets the same events on the same frames with the same clock and
+# mouse readings, so it makes the same decisions, only as fast as the machine
+# can go.
+#
+# File layout, all little-endian:
+#   header  b"OTREC" version:u8 seed_length:u8 seed:bytes saves_length:u32 saves:bytes
+#   saves   zlib-compressed (name_length:u8 data_length:u32 name data)*
+#   frame   ticks:u16 state:u8 flags:u8 [x:i16 y:i16] event_count:u16 event...
+#   event   kind:u8 payload (see EVENT_KINDS)
+# A frame's index is its position in the file and ticks is the time in ms since
+# the previous frame. Bit 0 of flags says the mouse moved, in which case its
+# new position follows. state is the game state when the frame started, which
+# replays check to catch sessions that no longer play out the same way. An
+# idle frame costs 6 bytes.
+import struct
+import zlib
+
+import pygame
+
+MAGIC = b"OTREC"
+VERSION = 2              # 1 had no saves
+MOUSE_MOVED = 1
+
+HEADER = struct.Struct("<BB")
+SAVES = struct.Struct("<I")
+SAVE_FILE = struct.Struct("<BI")  # name length, data length
+FRAME = struct.Struct("<HBB")
+POS = struct.Struct("<hh")
+COUNT = struct.Struct("<H")
+KEY = struct.Struct("<iHB")      # key, mod, length of the utf-8 unicode that follows
+BUTTON = struct.Struct("<hhB")   # x, y, button
+WHEEL = struct.Struct("<bb")
+
+# Event kinds stored in a recording; anything else (window events and the
+# like) never changes what the game does and is left out
+EVENT_KINDS = [pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEMOTION,
+               pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL]
+KIND_OF = {event_type: kind for kind, event_type in enumerate(EVENT_KINDS)}
+
+
+def clamp(value, low, high):
+    return max(low, min(high, int(value)))
+
+
+def encode_event(event):
+    kind = KIND_OF.get(event.type)
+    if kind is None:
+        return b""
+    data = bytes([kind])
+    if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+        text = getattr(event, "unicode", "").encode("utf-8")[:255]
+        data += KEY.pack(event.key, event.mod & 0xFFFF, len(text)) + text
+    elif event.type == pygame.MOUSEMOTION:
+        data += POS.pack(*event.pos)
+    elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+        data += BUTTON.pack(event.pos[0], event.pos[1], event.button)
+    elif event.type == pygame.MOUSEWHEEL:
+        data += WHEEL.pack(clamp(event.x, -128, 127), clamp(event.y, -128, 127))
+    return data
+
+
+# Returns the event and the offset just past it
+def decode_event(data, offset):
+    event_type = EVENT_KINDS[data[offset]]
+    offset += 1
+    if event_type in (pygame.KEYDOWN, pygame.KEYUP):
+        key, mod, length = KEY.unpack_from(data, offset)
+        offset += KEY.size
+        text = bytes(data[offset:offset + length]).decode("utf-8")
+        return pygame.event.Event(event_type, key=key, mod=mod, unicode=text, scancode=0), offset + length
+    if event_type == pygame.MOUSEMOTION:
+        pos = POS.unpack_from(data, offset)
+        return pygame.event.Event(event_type, pos=pos, rel=(0, 0), buttons=(0, 0, 0)), offset + POS.size
+    if event_type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+        x, y, button = BUTTON.unpack_from(data, offset)
+        return pygame.event.Event(event_type, pos=(x, y), button=button), offset + BUTTON.size
+    if event_type == pygame.MOUSEWHEEL:
+        x, y = WHEEL.unpack_from(data, offset)
+        return pygame.event.Event(event_type, x=x, y=y, flipped=False), offset + WHEEL.size
+    return pygame.event.Event(event_type), offset
+
+
+def encode_saves(files):
+    data = []
+    for name, content in files.items():
+        encoded = name.encode("utf-8")
+        data.append(SAVE_FILE.pack(len(encoded), len(content)) + encoded + content)
+    return zlib.compress(b"".join(data))
+
+
+def decode_saves(data):
+    data = zlib.decompress(data)
+    files = {}
+    offset = 0
+    while offset < len(data):
+        name_length, length = SAVE_FILE.unpack_from(data, offset)
+        offset += SAVE_FILE.size
+        name = data[offset:offset + name_length].decode("utf-8")
+        offset += name_length
+        files[name] = data[offset:offset + length]
+        offset += length
+    return files
+
+
+class Recorder:
+    replaying = False
+
+    # saves are the save files by name, as SaveManager.export_files() gives them
+    def __init__(self, path, seed, saves=None):
+        self.path = path
+        self.file = open(path, "wb")
+        seed_bytes = seed.to_bytes(max(1, (seed.bit_length() + 7) // 8), "little")
+        saves_bytes = encode_saves(saves or {})
+        self.file.write(MAGIC + HEADER.pack(VERSION, len(seed_bytes)) + seed_bytes
+                        + SAVES.pack(len(saves_bytes)) + saves_bytes)
+        self.frames = 0
+        self.ticks = 0
+        self.mouse_pos = (0, 0)
+
+    # Append one frame; ticks and mouse_pos are what the game reads this frame
+    def write_frame(self, ticks, state, mouse_pos, events):
+        flags = MOUSE_MOVED if mouse_pos != self.mouse_pos else 0
+        data = [FRAME.pack(clamp(ticks - self.ticks, 0, 0xFFFF), state, flags)]
+        if flags & MOUSE_MOVED:
+            data.append(POS.pack(*mouse_pos))
+        encoded = [encoded for encoded in map(encode_event, events) if encoded]
+        data.append(COUNT.pack(len(encoded)))
+        data.extend(encoded)
+        self.file.write(b"".join(data))
+        self.frames += 1
+        self.ticks = ticks
+        self.mouse_pos = mouse_pos
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class Replay:
+    replaying = True
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = memoryview(f.read())
+        if bytes(self.data[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a session recording")
+        version, seed_length = HEADER.unpack_from(self.data, len(MAGIC))
+        if version > VERSION:
+            raise ValueError(f"recording version {version} is newer than this game")
+        start = len(MAGIC) + HEADER.size
+        self.seed = int.from_bytes(self.data[start:start + seed_length], "little")
+        self.offset = start + seed_length
+        self.saves = {}  # save files there were when the session was recorded
+        if version >= 2:
+            saves_length, = SAVES.unpack_from(self.data, self.offset)
+            self.offset += SAVES.size
+            self.saves = decode_saves(bytes(self.data[self.offset:self.offset + saves_length]))
+            self.offset += saves_length
+        self.frames = 0
+        self.ticks = 0
+        self.delay = 0         # ms the last frame took when it was recorded
+        self.mouse_pos = (0, 0)
+        self.finished = False
+        self.divergence = None  # (frame, recorded state, replayed state) of the first mismatch
+
+    # Events of the next frame; once the recording runs out the game is asked to quit
+    def next_frame(self, state):
+        if self.offset >= len(self.data):
+            self.finished = True
+            self.delay = 0
+            return [pygame.event.Event(pygame.QUIT)]
+        self.delay, recorded_state, flags = FRAME.unpack_from(self.data, self.offset)
+        self.offset += FRAME.size
+        if flags & MOUSE_MOVED:
+            self.mouse_pos = POS.unpack_from(self.data, self.offset)
+            self.offset += POS.size
+        count, = COUNT.unpack_from(self.data, self.offset)
+        self.offset += COUNT.size
+        events = []
+        for _ in range(count):
+            event, self.offset = decode_event(self.data, self.offset)
+            events.append(event)
+        if recorded_state != state and self.divergence is None:
+            self.divergence = (self.frames, recorded_state, state)
+        self.frames += 1
+        self.ticks += self.delay
+        self.finished = self.offset >= len(self.data)
+        return events
+
+    def close(self):
+        self.data.release()
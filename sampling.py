@@ -0,0 +1,91 @@
+# Seeded randomness
+#
+# A run draws from one independent random stream per subsystem (daily travel,
+# trail events, hunting), all spawned from a single seed. Because the streams
+# are independent, extra draws in one subsystem (a longer hunt, an extra day of
+# travel) never shift what another one rolls, and a whole run can be replayed
+# from its seed.
+#
+# Weighted choices use Vose alias tables: building a table is O(K) for K
+# outcomes, and every draw afterwards is O(1) (one column pick and one coin
+# flip) however many outcomes there are. Tables are stacked in arrays, so a
+# batch of parties can each draw from their own table in one vectorized call.
+import numpy as np
+
+STREAMS = ["travel", "events", "hunting"]
+
+
+# Each stream's generator is made the first time it is drawn from, from the
+# same child seed SeedSequence.spawn would give it, so a run that never hunts
+# never pays for a hunting generator.
+class RandomStreams:
+    __slots__ = ("seed", "spawn_key", "pool_size", "names", "generators")
+
+    def __init__(self, seed=None, names=STREAMS):
+        sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.seed = sequence.entropy
+        self.spawn_key = sequence.spawn_key
+        self.pool_size = sequence.pool_size
+        self.names = names
+        self.generators = {}
+
+    def __getattr__(self, name):
+        if name in RandomStreams.__slots__ or name not in self.names:
+            raise AttributeError(name)
+        generator = self.generators.get(name)
+        if generator is None:
+            child = np.random.SeedSequence(self.seed, spawn_key=self.spawn_key + (self.names.index(name),),
+                                           pool_size=self.pool_size)
+            generator = self.generators[name] = np.random.default_rng(child)
+        return generator
+
+    # Bit generator states, plain data for save files. Streams never drawn
+    # from are left out: they start from the seed again on load.
+    def get_state(self):
+        return {name: generator.bit_generator.state for name, generator in self.generators.items()}
+
+    def set_state(self, state):
+        for name, stream_state in state.items():
+            if name in self.names:
+                getattr(self, name).bit_generator.state = stream_state
+
+
+# Vose's alias method for one row of weights. Returns (prob, alias): column i
+# keeps outcome i with probability prob[i] and otherwise gives alias[i].
+def build_alias(weights):
+    weights = np.asarray(weights, dtype=np.float64)
+    k = len(weights)
+    scaled = weights * k / weights.sum()
+    prob = np.ones(k)
+    alias = np.arange(k)
+    small = [i for i in range(k) if scaled[i] < 1.0]
+    large = [i for i in range(k) if scaled[i] >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    # Whatever is left is 1 up to rounding error
+    return prob, alias
+
+
+class AliasTables:
+    # weights has one row of K outcome weights per table; any leading
+    # dimensions index the tables, e.g. (classes, difficulties, segments, K)
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        self.shape = weights.shape[:-1]
+        self.k = weights.shape[-1]
+        rows = weights.reshape(-1, self.k)
+        self.prob = np.empty(rows.shape)
+        self.alias = np.empty(rows.shape, dtype=np.intp)
+        for i, row in enumerate(rows):
+            self.prob[i], self.alias[i] = build_alias(row)
+
+    # Draw one outcome per entry of the index arrays (one per table dimension)
+    # from two arrays of uniform samples in [0, 1)
+    def draw(self, indices, column_rolls, coin_rolls):
+        table = np.ravel_multi_index(indices, self.shape) if self.shape else 0
+        column = np.minimum((column_rolls * self.k).astype(np.intp), self.k - 1)
+        return np.where(coin_rolls < self.prob[table, column], column, self.alias[table, column])
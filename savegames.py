@@ -0,0 +1,282 @@
+# Multi-slot save games
+#
+# Each slot is a JSON file in the saves directory, next to a small index.json
+# that summarizes every slot so menus can list them without opening each save.
+# The game serializes a snapshot on the main thread and hands the bytes to a
+# background writer, which replaces files atomically (temp file + rename), so
+# a crash mid-write never corrupts an existing save and saving never stalls a
+# frame.
+#
+# Between full saves, state changes are appended to a per-slot journal
+# (<slot>.journal, one JSON line per change) in small fsync'd batches. Loading
+# a slot replays the journal tail on top of its snapshot, and every
+# COMPACT_EVERY entries the game writes a fresh snapshot and the journal is
+# truncated.
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+SAVE_VERSION = 1
+SAVE_DIR = "saves"
+INDEX_FILE = "index.json"
+LEGACY_SAVE_FILE = "savegame.json"  # single-slot save from before slots existed
+DEFAULT_SLOT = "autosave"
+JOURNAL_BATCH = 8         # entries buffered before they are written out
+JOURNAL_INTERVAL = 2.0    # seconds an entry may wait in the buffer
+COMPACT_EVERY = 50        # journal entries between full snapshots
+
+
+def slot_name(name):
+    name = re.sub(r"[^A-Za-z0-9_-]+", "_", name.strip()).strip("_")
+    return name[:40] or DEFAULT_SLOT
+
+
+# Write data to path so readers only ever see the old or the new file
+def write_atomic(path, data):
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+# Bring older save documents up to the current schema
+def migrate(document):
+    if "version" not in document:
+        # Legacy savegame.json: the fields were stored at the top level
+        document = {"version": 1, "saved_at": document.get("date", ""), "state": document}
+    if document["version"] > SAVE_VERSION:
+        raise ValueError(f"save version {document['version']} is newer than this game")
+    return document
+
+
+class SaveManager:
+    def __init__(self, directory=SAVE_DIR, background=None):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        # Browsers (pygbag) have no threads, so writes happen inline there
+        self.background = sys.platform != "emscripten" if background is None else background
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.written = threading.Condition(self.lock)  # notified as each job is written
+        self.outstanding = {}  # slot -> jobs queued for it and not written yet
+        self.queue = queue.Queue()
+        self.worker = None
+        self._index = None  # Read on first use
+        self.journal_buffers = {}
+        self.journal_started = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self.read_index()
+        return self._index
+
+    def read_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f).get("slots", {})
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def slot_path(self, slot):
+        return os.path.join(self.directory, slot_name(slot) + ".json")
+
+    def journal_path(self, slot):
+        return os.path.join(self.directory, slot_name(slot) + ".journal")
+
+    # Slot summaries, most recently saved first
+    def list_slots(self):
+        return sorted(self.index.items(), key=lambda item: item[1].get("saved_at", ""), reverse=True)
+
+    def latest_slot(self):
+        slots = self.list_slots()
+        return slots[0][0] if slots else None
+
+    # Queue a save of state (a dict of plain values) with a short summary for the index.
+    # The snapshot replaces the slot's journal, so state must include "journal_seq".
+    def save(self, slot, state, summary=None):
+        slot = slot_name(slot)
+        self.flush_journal(slot)
+        saved_at = datetime.now().isoformat(timespec="seconds")
+        document = json.dumps({"version": SAVE_VERSION, "saved_at": saved_at, "state": state}).encode()
+        with self.lock:
+            self.index[slot] = dict(summary or {}, saved_at=saved_at)
+        if not self.background:
+            self.write(slot, document)
+            return
+        with self.lock:
+            # Only the newest snapshot of a slot needs writing
+            queued = slot in self.pending
+            self.pending[slot] = document
+        if not queued:
+            self.submit(("snapshot", slot))
+
+    # Append one state change to the slot's journal buffer
+    def record(self, slot, entry):
+        slot = slot_name(slot)
+        buffer = self.journal_buffers.setdefault(slot, [])
+        buffer.append(json.dumps(entry, separators=(",", ":")) + "\n")
+        if self.journal_started is None:
+            self.journal_started = time.monotonic()
+        if len(buffer) >= JOURNAL_BATCH:
+            self.flush_journal(slot)
+
+    # Called once per frame; writes out journal entries that have waited too long
+    def tick(self):
+        if self.journal_started is not None and time.monotonic() - self.journal_started >= JOURNAL_INTERVAL:
+            self.flush_journal()
+
+    def flush_journal(self, slot=None):
+        slots = [slot] if slot is not None else list(self.journal_buffers)
+        for name in slots:
+            buffer = self.journal_buffers.pop(name, None)
+            if buffer:
+                data = "".join(buffer).encode()
+                if self.background:
+                    self.submit(("journal", name, data))
+                else:
+                    self.append_journal(name, data)
+        if not self.journal_buffers:
+            self.journal_started = None
+
+    def submit(self, job):
+        with self.lock:
+            self.outstanding[job[1]] = self.outstanding.get(job[1], 0) + 1
+        self.queue.put(job)
+        self.start_worker()
+
+    # The index as it stands now. It is built as it is written rather than
+    # when the save was queued, so a write that finishes late never puts back
+    # an older index that is missing newer slots.
+    def dump_index(self):
+        with self.lock:
+            return json.dumps({"version": SAVE_VERSION, "slots": self.index}).encode()
+
+    def write(self, slot, document):
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(self.slot_path(slot), document)
+        write_atomic(self.index_path, self.dump_index())
+        # Everything in the journal is now part of the snapshot. A crash before
+        # this point only leaves entries that replay skips by sequence number.
+        if os.path.exists(self.journal_path(slot)):
+            open(self.journal_path(slot), "wb").close()
+
+    def append_journal(self, slot, data):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.journal_path(slot), "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start_worker(self):
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self.run_worker, name="save-writer", daemon=True)
+            self.worker.start()
+
+    def run_worker(self):
+        while True:
+            job = self.queue.get()
+            kind, slot = job[0], job[1]
+            try:
+                if kind == "snapshot":
+                    with self.lock:
+                        document = self.pending.pop(slot)
+                    self.write(slot, document)
+                else:
+                    self.append_journal(slot, job[2])
+            except OSError as e:
+                print(f"Could not save {slot}: {e}", file=sys.stderr)
+            finally:
+                with self.lock:
+                    self.outstanding[slot] -= 1
+                    if not self.outstanding[slot]:
+                        del self.outstanding[slot]
+                    self.written.notify_all()
+                self.queue.task_done()
+
+    # Block until every queued save and journal entry is on disk
+    def flush(self):
+        self.flush_journal()
+        if self.background:
+            self.queue.join()
+
+    # Block until one slot's queued save and journal entries are on disk,
+    # however much other slots have queued
+    def flush_slot(self, slot):
+        self.flush_journal(slot_name(slot))
+        self.wait_for_slot(slot)
+
+    # Block until the writes already queued for one slot are done. Unlike the
+    # other methods this is safe to call from another thread, so a server can
+    # wait on a worker thread instead of its event loop.
+    def wait_for_slot(self, slot):
+        slot = slot_name(slot)
+        if self.background:
+            with self.written:
+                self.written.wait_for(lambda: slot not in self.outstanding)
+
+    # The save files (index, snapshots and journals) by file name, for carrying
+    # the saves along with something else, e.g. a session recording
+    def export_files(self):
+        self.flush()
+        files = {}
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return files
+        for name in names:
+            if name.endswith((".json", ".journal")):
+                with open(os.path.join(self.directory, name), "rb") as f:
+                    files[name] = f.read()
+        return files
+
+    # Put files from export_files() into this manager's directory
+    def import_files(self, files):
+        self.flush()
+        os.makedirs(self.directory, exist_ok=True)
+        for name, data in files.items():
+            write_atomic(os.path.join(self.directory, os.path.basename(name)), data)
+        self._index = None
+
+    # Journal entries newer than the snapshot, in order. A torn last line from a
+    # crash mid-append is ignored.
+    def read_journal(self, slot, after_seq):
+        entries = []
+        try:
+            with open(self.journal_path(slot), "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    if entry["seq"] > after_seq:
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        return entries
+
+    # Returns the saved state dict, or None if the slot does not exist.
+    # Journal entries recorded after the snapshot are replayed on top of it.
+    def load(self, slot=None):
+        slot = slot_name(slot or self.latest_slot() or DEFAULT_SLOT)
+        self.flush_slot(slot)
+        try:
+            with open(self.slot_path(slot), "r") as f:
+                document = json.load(f)
+        except FileNotFoundError:
+            if slot != DEFAULT_SLOT or not os.path.exists(LEGACY_SAVE_FILE):
+                return None
+            with open(LEGACY_SAVE_FILE, "r") as f:
+                document = json.load(f)
+        state = migrate(document)["state"]
+        for entry in self.read_journal(slot, state.get("journal_seq", 0)):
+            state.update(entry["set"])
+            state["journal_seq"] = entry["seq"]
+        return state
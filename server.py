@@ -0,0 +1,357 @@
+# Headless game server
+#
+# Hosts many trail runs from one process, one per kiosk or remote client, with
+# the clients drawing the game themselves. Each run is an ordinary GameState
+# from the game script, so the rules, the dice and the save files are the same
+# as on the desktop:
+#
+#   python server.py --port 8765 --saves server-saves
+#
+# Clients connect over TCP and send one JSON object per line. A request names
+# an action and may carry an "id" that is echoed in the reply:
+#
+#   {"id": 1, "action": "open", "session": "kiosk-3"}        full state
+#   {"id": 2, "action": "class", "value": "Farmer"}          diff
+#   {"id": 3, "action": "travel", "days": 1}                 diff and trip
+#
+# Actions: open, name, class, difficulty, pace, rations, travel, hunt (with
+# the hunting game's score), buy (packs by item key), save and stats. After
+# open, a reply only carries the fields the action changed ("diff"), and only
+# the changed item counts of the inventory. Errors come back as
+# {"ok": false, "error": ...} and leave the session as it was.
+#
+# Every change is journaled as the game does it, and sessions left idle are
+# saved and dropped from memory. The next request for one loads it back, so a
+# kiosk that wanders off costs nothing but its save file.
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import signal
+import sys
+import time
+import traceback
+
+import catalog
+import highscores
+import savegames
+import trail_engine
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+GAME_FILE = os.path.join(REPO_ROOT, "Team A's Interface - Claude Test - V13 - Long code.py")
+
+DEFAULT_PORT = 8765
+IDLE_TIMEOUT = 60.0      # seconds without a request before a session is evicted
+SWEEP_INTERVAL = 5.0     # how often idle sessions are looked for
+MAX_LINE = 64 * 1024
+
+# Fields a client sees, in the order they are sent
+VIEW_FIELDS = ["character_name", "character_class", "difficulty", "health", "money", "miles", "day",
+               "progress", "current_location_index", "pace", "rations", "inventory", "status"]
+
+
+# The game script holds GameState. Importing it only loads pygame; nothing
+# opens a window until its main() runs.
+def load_game():
+    spec = importlib.util.spec_from_file_location("oregon_trail", GAME_FILE)
+    game = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(game)
+    return game
+
+
+def get_status(game_state):
+    if not game_state.is_alive():
+        return "dead"
+    if game_state.get_progress_percentage() >= 100:
+        return "arrived"
+    return "travelling"
+
+
+# What a client sees of a run: plain values, without the dice
+def get_view(game_state):
+    view = {field: getattr(game_state, field) for field in VIEW_FIELDS[:-2]}
+    view["inventory"] = dict(game_state.inventory)
+    view["status"] = get_status(game_state)
+    return view
+
+
+# Fields of new that differ from old; for the inventory, just the changed counts
+def diff_view(old, new):
+    diff = {}
+    for field, value in new.items():
+        if field == "inventory":
+            items = {key: count for key, count in value.items() if old["inventory"].get(key) != count}
+            items.update({key: 0 for key in old["inventory"] if key not in value})
+            if items:
+                diff["inventory"] = items
+        elif old.get(field) != value:
+            diff[field] = value
+    return diff
+
+
+class ActionError(Exception):
+    pass
+
+
+class Session:
+    def __init__(self, session_id, game_state):
+        self.id = session_id
+        self.game_state = game_state
+        self.view = get_view(game_state)
+        self.last_active = time.monotonic()
+
+
+class GameServer:
+    def __init__(self, game, directory=savegames.SAVE_DIR, idle_timeout=IDLE_TIMEOUT):
+        self.game = game
+        # Every session shares one save writer; each run journals to its own slot
+        game.save_manager = savegames.SaveManager(directory)
+        game.high_scores = highscores.HighScores(directory)
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self.loading = {}  # session ID -> task bringing it back from its save
+        self.actions = 0
+        self.evictions = 0
+        self.started = time.monotonic()
+        self.handlers = {
+            "name": self.on_name,
+            "class": self.on_class,
+            "difficulty": self.on_difficulty,
+            "pace": self.on_pace,
+            "rations": self.on_rations,
+            "travel": self.on_travel,
+            "hunt": self.on_hunt,
+            "buy": self.on_buy,
+            "save": self.on_save,
+        }
+
+    # The session with this ID: in memory, loaded back from its save, or new.
+    # Requests that arrive while it is loading wait for the same load.
+    async def get_session(self, session_id, seed=None):
+        session = self.sessions.get(session_id)
+        if session is None:
+            if session_id not in self.loading:
+                self.loading[session_id] = asyncio.ensure_future(self.load_session(session_id, seed))
+            session = await asyncio.shield(self.loading[session_id])
+        session.last_active = time.monotonic()
+        return session
+
+    async def load_session(self, session_id, seed):
+        try:
+            game_state = self.game.GameState(seed=seed)
+            game_state.slot = session_id
+            save_manager = self.game.save_manager
+            if session_id in save_manager.index:
+                # An evicted session's snapshot may still be queued. Wait for it
+                # on a worker thread so other connections aren't held up; the
+                # load then finds nothing left to wait for.
+                save_manager.flush_journal(session_id)
+                await asyncio.get_running_loop().run_in_executor(None, save_manager.wait_for_slot, session_id)
+                game_state.load_game(session_id)
+            session = self.sessions[session_id] = Session(session_id, game_state)
+            return session
+        finally:
+            del self.loading[session_id]
+
+    # Save a session and let it go; it comes back from disk on its next request
+    def evict(self, session):
+        session.game_state.save_game()
+        del self.sessions[session.id]
+        self.evictions += 1
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for session in [s for s in self.sessions.values() if s.last_active < cutoff]:
+            self.evict(session)
+
+    async def sweep(self):
+        while True:
+            await asyncio.sleep(min(SWEEP_INTERVAL, self.idle_timeout))
+            self.evict_idle()
+            self.game.save_manager.tick()
+
+    # Run one request for a connection; returns the reply and the session the
+    # connection is on afterwards
+    async def handle(self, request, session_id):
+        action = request.get("action")
+        self.actions += 1
+        if action == "stats":
+            return self.get_stats(), session_id
+        if action == "open":
+            seed = request.get("seed")
+            if not request.get("session") or not (seed is None or isinstance(seed, int) and seed >= 0):
+                raise ActionError("open needs a session ID and optionally a seed")
+            session_id = savegames.slot_name(str(request["session"]))
+            session = await self.get_session(session_id, seed)
+            session.view = get_view(session.game_state)
+            return {"session": session_id, "state": session.view}, session_id
+        if session_id is None:
+            raise ActionError("open a session first")
+        handler = self.handlers.get(action)
+        if handler is None:
+            raise ActionError(f"unknown action {action!r}")
+        session = await self.get_session(session_id)
+        reply = handler(session.game_state, request) or {}
+        view = get_view(session.game_state)
+        reply["diff"] = diff_view(session.view, view)
+        session.view = view
+        return reply, session_id
+
+    def get_stats(self):
+        return {
+            "sessions": len(self.sessions),
+            "actions": self.actions,
+            "evictions": self.evictions,
+            "cpu_seconds": time.process_time(),
+            "uptime": time.monotonic() - self.started,
+        }
+
+    def on_name(self, game_state, request):
+        game_state.character_name = str(request.get("value", ""))[:40]
+        game_state.record("name", character_name=game_state.character_name)
+
+    def on_class(self, game_state, request):
+        character_class = request.get("value")
+        if character_class not in trail_engine.CLASSES[1:]:
+            raise ActionError(f"unknown class {character_class!r}")
+        game_state.set_character_class(character_class)
+        game_state.record("class", character_class=game_state.character_class, money=game_state.money)
+
+    def on_difficulty(self, game_state, request):
+        difficulty = request.get("value")
+        if difficulty not in trail_engine.DIFFICULTIES[1:]:
+            raise ActionError(f"unknown difficulty {difficulty!r}")
+        game_state.difficulty = difficulty
+        game_state.record("difficulty", difficulty=game_state.difficulty)
+        game_state.save_game()  # The run starts here, as in the game
+
+    def on_pace(self, game_state, request):
+        if request.get("value") not in trail_engine.PACES:
+            raise ActionError(f"unknown pace {request.get('value')!r}")
+        game_state.pace = request["value"]
+        game_state.record("pace", pace=game_state.pace)
+
+    def on_rations(self, game_state, request):
+        if request.get("value") not in trail_engine.RATIONS:
+            raise ActionError(f"unknown rations {request.get('value')!r}")
+        game_state.rations = request["value"]
+        game_state.record("rations", rations=game_state.rations)
+
+    # Travel to the next landmark, or for at most "days" days
+    def on_travel(self, game_state, request):
+        days = request.get("days")
+        if days is not None and (not isinstance(days, int) or days < 1):
+            raise ActionError("days must be a positive whole number")
+        trip = game_state.travel(max_days=days)
+        if trip is None:
+            raise ActionError("the party can't travel any further")
+        game_state.record("travel", current_location_index=game_state.current_location_index,
+                          miles=game_state.miles, day=game_state.day, progress=game_state.progress,
+                          health=game_state.health, money=game_state.money,
+                          inventory=dict(game_state.inventory), rng_state=game_state.streams.get_state())
+        reply = {"trip": trip, "events": game_state.last_events}
+        if get_status(game_state) == "arrived":
+            reply["score"] = self.game.high_scores.add_run(
+                game_state.character_name, game_state.character_class, game_state.difficulty,
+                game_state.health, game_state.money, game_state.inventory.get("food", 0))
+        return reply
+
+    # The hunting game runs on the client, which reports its score
+    def on_hunt(self, game_state, request):
+        score = request.get("score")
+        if not isinstance(score, int) or score < 0:
+            raise ActionError("score must be a whole number of hits")
+        food = game_state.add_hunted_food(score)
+        game_state.record("hunt", inventory=dict(game_state.inventory), rng_state=game_state.streams.get_state())
+        return {"food": food}
+
+    # Buy {"items": {"food": 3, ...}}: packs of each item, as one transaction
+    def on_buy(self, game_state, request):
+        items = request.get("items")
+        if not isinstance(items, dict):
+            raise ActionError("items must map item keys to packs")
+        cart = catalog.Cart(catalog.CATALOG)
+        for key, packs in items.items():
+            if key not in catalog.CATALOG.ids or not isinstance(packs, int) or packs < 1:
+                raise ActionError(f"can't buy {packs!r} of {key!r}")
+            cart.add(catalog.CATALOG.ids[key], packs)
+        if not game_state.buy(cart):
+            raise ActionError("not enough money")
+
+    def on_save(self, game_state, request):
+        game_state.save_game()
+
+    async def serve_client(self, reader, writer):
+        session_id = None
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    break
+                if not line:
+                    break
+                request = {}
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        request = {}
+                        raise ActionError("requests must be JSON objects")
+                    reply, session_id = await self.handle(request, session_id)
+                    reply["ok"] = True
+                except (ActionError, ValueError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                except Exception as e:
+                    # A bug in one action shouldn't cost the client its connection
+                    traceback.print_exc()
+                    reply = {"ok": False, "error": f"internal error ({type(e).__name__})"}
+                if "id" in request:
+                    reply["id"] = request["id"]
+                writer.write(json.dumps(reply, separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def run(self, host="127.0.0.1", port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.serve_client, host, port, limit=MAX_LINE)
+        sweeper = asyncio.create_task(self.sweep())
+        # Stop cleanly (saving every session) on SIGTERM as well as Ctrl+C
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:  # Windows
+            pass
+        address = server.sockets[0].getsockname()
+        print(f"Listening on {address[0]}:{address[1]}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            sweeper.cancel()
+            self.shutdown()
+
+    # Save every session still in memory
+    def shutdown(self):
+        for session in list(self.sessions.values()):
+            self.evict(session)
+        self.game.save_manager.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many Oregon Trail runs for thin clients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 picks a free port")
+    parser.add_argument("--saves", default=savegames.SAVE_DIR, help="directory for session saves")
+    parser.add_argument("--idle", type=float, default=IDLE_TIMEOUT, help="seconds before an idle session is evicted")
+    args = parser.parse_args()
+
+    server = GameServer(load_game(), args.saves, args.idle)
+    try:
+        asyncio.run(server.run(args.host, args.port))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    print(f"Served {server.actions} actions, evicted {server.evictions} sessions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+# Headless Oregon Trail rules engine
+#
+# The game rules live here so they can run without pygame or a display.
+# Parties are held as NumPy arrays and advanced one leg (landmark to landmark)
+# at a time in lock-step, so the same code that moves the player's wagon can
+# simulate hundreds of thousands of trails for balance analysis:
+#
+#   python trail_engine.py --parties 100000 --workers 4 --seed 1
+#
+# A leg is travelled day by day: each day the wagon covers its pace in miles,
+# the party eats according to its rations, and health drifts with strain and
+# rest. The days of a leg are resolved together as arrays, so fast-forwarding
+# to the next landmark costs the same as a single day.
+#
+# The landmarks, classes and difficulties are game content, read from the
+# data files by content.py; the rules and their numbers stay here.
+import argparse
+import bisect
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import content
+from sampling import AliasTables, RandomStreams
+
+START_HEALTH = 100
+MAX_HEALTH = 100
+START_MONEY = 1000
+START_FOOD = 1000        # pounds
+
+# Daily travel. Each day the party loses 1 health with the pace's strain
+# chance, regains 1 with the rations' recovery chance, and loses
+# STARVATION_DAMAGE when there is no food left.
+PACES = ["Steady", "Strenuous", "Grueling"]
+PACE_MILES = np.array([15, 20, 25])
+PACE_STRAIN = np.array([0.1, 0.2, 0.35])
+RATIONS = ["Filling", "Meager", "Bare bones"]
+RATION_FOOD = np.array([8, 5, 3])  # pounds the whole party eats per day
+RATION_RECOVERY = np.array([0.1, 0.03, 0.0])
+STARVATION_DAMAGE = 1
+
+# Per-leg hazards
+LEG_WEAR = 6             # health lost on every leg
+ILLNESS_DAMAGE = 25
+REPAIR_COST = 60
+STRANDED_DAMAGE = 10     # health lost when a breakdown can't be paid for
+STORM_DAMAGE = 5
+THIEF_MONEY = 50         # most money thieves can take
+THIEF_FOOD = 100         # pounds of food thieves can take
+WILD_FRUIT_FOOD = 60
+FORAGE_HEALTH = 2        # health regained from hunting and gathering on a leg
+MEDICINE_THRESHOLD = 50  # buy medicine when health drops below this
+MEDICINE_COST = 150
+MEDICINE_HEALTH = 15
+HUNT_FOOD_PER_HIT = 15   # pounds of food per animal shot in the hunting game
+
+# Trail events: at each landmark the party meets exactly one of EVENTS. The
+# chance of each depends on class, difficulty and the segment of trail the
+# leg crossed; "none" takes whatever probability is left over.
+EVENTS = ["none", "illness", "breakdown", "storm", "thieves", "wild_fruit"]
+EVENT_CHANCE = np.array([0.0, 0.15, 0.15, 0.06, 0.04, 0.08])
+HAZARDS = np.array([False, True, True, True, True, False])  # scaled by difficulty
+# Segments of trail. Where each starts is content: the landmark whose
+# "segment" names it (see apply_content).
+SEGMENTS = ["Plains", "Mountains", "Columbia"]
+SEGMENT_EVENTS = np.array([
+    [1.0, 1.4, 0.8, 0.8, 1.0, 1.0],   # cholera on the crowded plains
+    [1.0, 0.8, 1.4, 1.5, 0.8, 1.2],   # rough passes and mountain weather
+    [1.0, 1.0, 1.0, 1.3, 1.5, 1.0],   # river rain and raiders on the last stretch
+])
+
+
+def event_chances():
+    chances = (EVENT_CHANCE * CLASS_EVENTS[:, None, None, :] * SEGMENT_EVENTS[None, None, :, :]
+               * np.where(HAZARDS, DIFFICULTY_HAZARD[:, None], 1.0)[None, :, None, :])
+    chances[..., 0] = np.maximum(1.0 - chances[..., 1:].sum(axis=-1), 0.0)
+    return chances
+
+
+# The trail, classes and difficulties come from the content files. This
+# builds the tables the rules use from them, at import and again when the
+# game reloads its content. Index 0 of the class and difficulty tables is the
+# neutral entry used when none was picked (e.g. a game started from SETTINGS).
+def apply_content(data):
+    global ROUTES, LOCATIONS, ROUTE_X, ROUTE_Y, LAST_LOCATION, TOTAL_DISTANCE, LANDMARK_MILES, LANDMARK_SEGMENTS
+    global CLASSES, CLASS_MONEY, CLASS_FORAGE, CLASS_EVENTS
+    global DIFFICULTIES, DIFFICULTY_DAMAGE, DIFFICULTY_HAZARD, EVENT_TABLES
+    classes, difficulties = data["classes"], data["difficulties"]
+    class_events = np.ones((len(classes) + 1, len(EVENTS)))
+    for row, record in enumerate(classes, 1):
+        for event, weight in record["events"].items():
+            if event not in EVENTS[1:]:
+                raise content.ContentError(f"classes.json: {record['id']}: unknown event {event!r}")
+            class_events[row, EVENTS.index(event)] = weight
+    # Each landmark is in the segment it starts, or else the one before it
+    segments = []
+    for landmark in data["landmarks"]:
+        if landmark["segment"] is not None:
+            if landmark["segment"] not in SEGMENTS:
+                raise content.ContentError(f"trail.json: {landmark['name']}: unknown segment {landmark['segment']!r}")
+            segment = SEGMENTS.index(landmark["segment"])
+        segments.append(segment)
+
+    # Route landmarks and their position on the 510x380 travel map
+    ROUTES = {landmark["name"]: (landmark["x"], landmark["y"]) for landmark in data["landmarks"]}
+    LOCATIONS = list(ROUTES)
+    ROUTE_X = np.array([x for x, y in ROUTES.values()], dtype=np.float64)
+    ROUTE_Y = np.array([y for x, y in ROUTES.values()], dtype=np.float64)
+    LAST_LOCATION = len(LOCATIONS) - 1
+    # Miles from the start to each landmark, for bisecting a distance to a location
+    LANDMARK_MILES = [landmark["miles"] for landmark in data["landmarks"]]
+    TOTAL_DISTANCE = LANDMARK_MILES[-1]
+    # Segment of trail each leg (by the landmark it starts from) belongs to
+    LANDMARK_SEGMENTS = np.array(segments, dtype=np.intp)
+
+    CLASSES = [""] + [record["id"] for record in classes]
+    CLASS_MONEY = np.array([1.0] + [record["money"] for record in classes])
+    CLASS_FORAGE = np.array([1.0] + [record["forage"] for record in classes])
+    CLASS_EVENTS = class_events
+    DIFFICULTIES = [""] + [record["id"] for record in difficulties]
+    DIFFICULTY_DAMAGE = np.array([1.0] + [record["damage"] for record in difficulties])
+    DIFFICULTY_HAZARD = np.array([1.0] + [record["hazard"] for record in difficulties])
+
+    # One alias table per class x difficulty x segment
+    EVENT_TABLES = AliasTables(event_chances())
+
+
+apply_content(content.get())
+
+
+def class_index(character_class):
+    return CLASSES.index(character_class) if character_class in CLASSES else 0
+
+
+def difficulty_index(difficulty):
+    return DIFFICULTIES.index(difficulty) if difficulty in DIFFICULTIES else 0
+
+
+def pace_index(pace):
+    return PACES.index(pace) if pace in PACES else 0
+
+
+def ration_index(rations):
+    return RATIONS.index(rations) if rations in RATIONS else 0
+
+
+def starting_money(character_class):
+    return int(START_MONEY * CLASS_MONEY[class_index(character_class)])
+
+
+def progress_percentage(miles):
+    return miles / TOTAL_DISTANCE * 100
+
+
+# Index of the last landmark at or behind the given distance
+def location_at(miles):
+    return bisect.bisect_right(LANDMARK_MILES, miles) - 1
+
+
+# Where a party that has travelled miles is on the map (in ROUTES
+# coordinates): landmarks are joined by straight lines, covered at an even
+# pace. Works on arrays of miles too.
+def route_position(miles):
+    return np.interp(miles, LANDMARK_MILES, ROUTE_X), np.interp(miles, LANDMARK_MILES, ROUTE_Y)
+
+
+# Trail segment index for a leg starting at location
+def segment_index(location):
+    return LANDMARK_SEGMENTS[location]
+
+
+# Days needed to cover miles at each pace index
+def days_to_travel(miles, pace_idx):
+    return -(-np.asarray(miles) // PACE_MILES[pace_idx])
+
+
+# Travel every party for up to days[i] days at once. rolls is a (2, n, max_days)
+# array of uniform samples for strain and recovery. A party stops on the day its
+# health reaches zero. Returns the new health and food arrays, the days each
+# party actually travelled and how many of those it went without food.
+def travel_days(health, food, pace_idx, ration_idx, days, rolls):
+    n, max_days = rolls.shape[1], rolls.shape[2]
+    day = np.arange(1, max_days + 1)
+    travelling = day <= days[:, None]
+    eaten = RATION_FOOD[ration_idx][:, None] * day
+    starving = travelling & (eaten > food[:, None])
+
+    change = (rolls[1] < RATION_RECOVERY[ration_idx][:, None]).astype(np.int32)
+    change -= rolls[0] < PACE_STRAIN[pace_idx][:, None]
+    change -= STARVATION_DAMAGE * starving
+    change *= travelling
+    # Running health capped at MAX_HEALTH: subtract however far the uncapped
+    # sum has ever overshot the cap
+    uncapped = health[:, None] + np.cumsum(change, axis=1)
+    daily_health = uncapped - np.maximum(np.maximum.accumulate(uncapped - MAX_HEALTH, axis=1), 0)
+
+    dead = (daily_health <= 0) & travelling
+    days_travelled = np.where(dead.any(axis=1), dead.argmax(axis=1) + 1, days)
+    last = np.maximum(days_travelled - 1, 0)
+    new_health = np.where(days_travelled > 0, daily_health[np.arange(n), last], health)
+    new_food = np.maximum(food - RATION_FOOD[ration_idx] * days_travelled, 0)
+    starved = (starving & (day <= days_travelled[:, None])).sum(axis=1)
+    return np.maximum(new_health, 0).astype(health.dtype), new_food.astype(food.dtype), days_travelled, starved
+
+
+# Resolve the landmark at the end of a leg for every party in the arrays.
+# location is the landmark each leg started from. rolls is a (3, n) array of
+# uniform samples: two for the party's trail event and one for foraging.
+# Returns the new health, money and food arrays and a dict of boolean arrays
+# saying what happened.
+def resolve_legs(health, money, food, class_idx, difficulty_idx, location, rolls):
+    damage = DIFFICULTY_DAMAGE[difficulty_idx]
+    class_idx, difficulty_idx, segment = np.broadcast_arrays(class_idx, difficulty_idx, segment_index(location))
+    event = EVENT_TABLES.draw((class_idx, difficulty_idx, segment), rolls[0], rolls[1])
+
+    illness = event == EVENTS.index("illness")
+    breakdown = event == EVENTS.index("breakdown")
+    repaired = breakdown & (money >= REPAIR_COST)
+    stranded = breakdown & ~repaired
+    storm = event == EVENTS.index("storm")
+    thieves = event == EVENTS.index("thieves")
+    wild_fruit = event == EVENTS.index("wild_fruit")
+    forage = np.rint(FORAGE_HEALTH * CLASS_FORAGE[class_idx] * rolls[2]).astype(health.dtype)
+
+    lost = ILLNESS_DAMAGE * illness + STRANDED_DAMAGE * stranded + STORM_DAMAGE * storm
+    health = health - np.rint(damage * (LEG_WEAR + lost)).astype(health.dtype)
+    health = np.minimum(health + forage, MAX_HEALTH)
+    money = money - REPAIR_COST * repaired - np.minimum(money, THIEF_MONEY) * thieves
+    food = food - np.minimum(food, THIEF_FOOD) * thieves + WILD_FRUIT_FOOD * wild_fruit
+
+    medicine = (health > 0) & (health < MEDICINE_THRESHOLD) & (money >= MEDICINE_COST)
+    health = np.minimum(health + MEDICINE_HEALTH * medicine, MAX_HEALTH)
+    money = money - MEDICINE_COST * medicine
+
+    events = {"illness": illness, "breakdown": repaired, "stranded": stranded, "storm": storm,
+              "thieves": thieves, "wild_fruit": wild_fruit, "medicine": medicine}
+    return np.maximum(health, 0), money, food, events
+
+
+# A batch of parties travelling in lock-step
+class Parties:
+    def __init__(self, class_idx, difficulty_idx, pace_idx=None, ration_idx=None):
+        n = len(class_idx)
+        self.class_idx = np.asarray(class_idx, dtype=np.int8)
+        self.difficulty_idx = np.asarray(difficulty_idx, dtype=np.int8)
+        self.pace_idx = np.zeros(n, dtype=np.int8) if pace_idx is None else np.asarray(pace_idx, dtype=np.int8)
+        self.ration_idx = np.zeros(n, dtype=np.int8) if ration_idx is None else np.asarray(ration_idx, dtype=np.int8)
+        self.location = np.zeros(n, dtype=np.int16)
+        self.miles = np.zeros(n, dtype=np.int32)
+        self.days = np.zeros(n, dtype=np.int32)
+        self.health = np.full(n, START_HEALTH, dtype=np.int32)
+        self.food = np.full(n, START_FOOD, dtype=np.int32)
+        self.money = np.rint(START_MONEY * CLASS_MONEY[self.class_idx]).astype(np.int32)
+
+    @classmethod
+    def create(cls, n, character_class="", difficulty="", pace="", rations=""):
+        return cls(np.full(n, class_index(character_class)), np.full(n, difficulty_index(difficulty)),
+                   np.full(n, pace_index(pace)), np.full(n, ration_index(rations)))
+
+    def __len__(self):
+        return len(self.location)
+
+    def alive(self):
+        return self.health > 0
+
+    def arrived(self):
+        return self.location >= LAST_LOCATION
+
+    def active(self):
+        return self.alive() & ~self.arrived()
+
+    # Move every active party one landmark along the trail, day by day
+    def advance(self, streams):
+        active = np.flatnonzero(self.active())
+        if len(active) == 0:
+            return False
+        pace_idx = self.pace_idx[active]
+        target = np.asarray(LANDMARK_MILES)[self.location[active] + 1]
+        days = days_to_travel(target - self.miles[active], pace_idx)
+        health, food, days_travelled, _ = travel_days(self.health[active], self.food[active], pace_idx,
+                                                      self.ration_idx[active], days,
+                                                      streams.travel.random((2, len(active), int(days.max()))))
+        self.miles[active] = np.minimum(target, self.miles[active] + days_travelled * PACE_MILES[pace_idx])
+        self.days[active] += days_travelled
+        self.food[active] = food
+
+        # Landmark hazards for the parties that made it there
+        arrived = active[health > 0]
+        health, money, food, _ = resolve_legs(health[health > 0], self.money[arrived], self.food[arrived],
+                                              self.class_idx[arrived], self.difficulty_idx[arrived],
+                                              self.location[arrived], streams.events.random((3, len(arrived))))
+        self.health[active] = 0
+        self.health[arrived] = health
+        self.money[arrived] = money
+        self.food[arrived] = food
+        self.location[arrived] += (health > 0)
+        return True
+
+    def run(self, streams):
+        while self.advance(streams):
+            pass
+
+
+# Simulate n parties of one class and difficulty and return aggregate counts
+def simulate(n, character_class="", difficulty="", seed=None, pace="", rations=""):
+    parties = Parties.create(n, character_class, difficulty, pace, rations)
+    parties.run(RandomStreams(seed))
+    arrived = parties.arrived()
+    return {
+        "parties": n,
+        "arrived": int(arrived.sum()),
+        "died": int((~parties.alive()).sum()),
+        "health_sum": int(parties.health[arrived].sum()),
+        "money_sum": int(parties.money[arrived].sum()),
+        "days_sum": int(parties.days[arrived].sum()),
+        "location_sum": int(parties.location.sum()),
+    }
+
+
+def _simulate_task(task):
+    return task[1], task[2], simulate(*task)
+
+
+# Run parties_per_combo trails for every class x difficulty, spread over a
+# process pool in chunks, and return aggregated statistics per combination
+def run_balance(parties_per_combo, workers=None, seed=0, chunk_size=50000,
+                classes=None, difficulties=None, pace="", rations=""):
+    classes = CLASSES[1:] if classes is None else classes
+    difficulties = DIFFICULTIES[1:] if difficulties is None else difficulties
+    seeds = np.random.SeedSequence(seed)
+    tasks = []
+    for character_class in classes:
+        for difficulty in difficulties:
+            remaining = parties_per_combo
+            while remaining > 0:
+                n = min(chunk_size, remaining)
+                child_seed = seeds.spawn(1)[0]
+                tasks.append((n, character_class, difficulty, child_seed, pace, rations))
+                remaining -= n
+
+    totals = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for character_class, difficulty, result in pool.map(_simulate_task, tasks):
+            total = totals.setdefault((character_class, difficulty), dict.fromkeys(result, 0))
+            for key, value in result.items():
+                total[key] += value
+
+    stats = {}
+    for key, total in totals.items():
+        n, arrived = total["parties"], total["arrived"]
+        stats[key] = {
+            "parties": n,
+            "arrival_rate": arrived / n,
+            "death_rate": total["died"] / n,
+            "mean_health_on_arrival": total["health_sum"] / arrived if arrived else 0.0,
+            "mean_money_on_arrival": total["money_sum"] / arrived if arrived else 0.0,
+            "mean_days_on_arrival": total["days_sum"] / arrived if arrived else 0.0,
+            "mean_landmarks_reached": total["location_sum"] / n,
+        }
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate Oregon Trail runs for balance analysis")
+    parser.add_argument("--parties", type=int, default=100000, help="parties per class and difficulty")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--pace", choices=PACES, default=PACES[0])
+    parser.add_argument("--rations", choices=RATIONS, default=RATIONS[0])
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = run_balance(args.parties, args.workers, args.seed, args.chunk_size, pace=args.pace, rations=args.rations)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'class':<10} {'difficulty':<10} {'arrived':>8} {'died':>8} {'health':>8} {'money':>8} {'days':>6} {'landmarks':>10}")
+    for (character_class, difficulty), row in stats.items():
+        print(f"{character_class:<10} {difficulty:<10} {row['arrival_rate']:>8.1%} {row['death_rate']:>8.1%} "
+              f"{row['mean_health_on_arrival']:>8.1f} {row['mean_money_on_arrival']:>8.0f} "
+              f"{row['mean_days_on_arrival']:>6.0f} {row['mean_landmarks_reached']:>10.2f}")
+    total = sum(row["parties"] for row in stats.values())
+    print(f"{total} trails in {elapsed:.2f}s ({total / elapsed * 60:,.0f} trails/minute)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# Zoomable trail map tiles
+#
+# The PROGRESS_MAP screen shows the trail as one large map that can be dragged
+# and zoomed. The map is cut into a pyramid of square tiles: level 0 draws the
+# map at the size of the TRAVEL screen's map, and each level up doubles it.
+# Tiles are only drawn when they come into view, and the most recently used
+# ones are kept in an LRU cache, so a frame costs a few blits whatever the
+# zoom, and memory stays bounded however large the top level is.
+#
+# Each level places its own labels, in a font sized for that level, and
+# leaves out any that would overlap a more important one. Zoomed out, the
+# crowded landmarks near Oregon share one label; zoomed in, they all get theirs.
+import collections
+import math
+
+import pygame
+
+TILE_SIZE = 256
+MAX_LEVEL = 5              # level 5 is 32 times the size of level 0
+TILE_CACHE_SIZE = 64       # tiles kept drawn, 256 KB each
+LABEL_SIZES = [15, 18, 21, 24, 28, 32]  # label font size at each level
+GRID_UNITS = 50            # map units between grid lines
+MINOR_GRID_UNITS = 10      # finer grid, once it is at least MINOR_GRID_MIN pixels apart
+MINOR_GRID_MIN = 40
+
+BACKGROUND = (238, 226, 196)
+GRID_COLOR = (224, 208, 172)
+MINOR_GRID_COLOR = (232, 219, 187)
+TRAIL_COLOR = (255, 0, 0)
+MARKER_COLOR = (0, 123, 255)
+LABEL_COLOR = (0, 0, 0)
+
+
+def trail_width(level):
+    return 3 + level
+
+
+def marker_radius(level):
+    return 5 + level
+
+
+class TilePyramid:
+    def __init__(self, routes, size, tile_size=TILE_SIZE, max_level=MAX_LEVEL, cache_size=TILE_CACHE_SIZE):
+        self.names = list(routes)
+        self.points = list(routes.values())
+        self.size = size  # of the map in map units, which are level 0 pixels
+        self.tile_size = tile_size
+        self.max_level = max_level
+        self.cache_size = cache_size
+        self.tiles = collections.OrderedDict()  # (level, tx, ty) -> surface, least recently used first
+        self.labels = {}  # level -> [(surface, rect in level pixels)]
+        self.fonts = {}
+        self.rendered = 0  # tiles drawn so far
+
+    def get_scale(self, level):
+        return 2 ** level
+
+    def get_level_size(self, level):
+        scale = self.get_scale(level)
+        return math.ceil(self.size[0] * scale), math.ceil(self.size[1] * scale)
+
+    def get_font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    # A level's labels, placed start and finish first and then along the
+    # trail, each left out if it would overlap one already placed
+    def get_labels(self, level):
+        labels = self.labels.get(level)
+        if labels is not None:
+            return labels
+        scale = self.get_scale(level)
+        bounds = pygame.Rect((0, 0), self.get_level_size(level))
+        font = self.get_font(LABEL_SIZES[min(level, len(LABEL_SIZES) - 1)])
+        last = len(self.names) - 1
+        order = [0, last] + list(range(1, last))
+        labels = []
+        for i in order:
+            text = font.render(self.names[i], True, LABEL_COLOR)
+            x, y = self.points[i]
+            rect = text.get_rect(midbottom=(round(x * scale), round(y * scale) - marker_radius(level) - 2))
+            rect = rect.clamp(bounds)  # Labels at the edges stay on the map
+            padded = rect.inflate(6, 2)
+            if not any(padded.colliderect(placed) for _, placed in labels):
+                labels.append((text, rect))
+        self.labels[level] = labels
+        return labels
+
+    # The tile, drawing it unless render is False (then None if not cached)
+    def get_tile(self, level, tx, ty, render=True):
+        key = (level, tx, ty)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+            return tile
+        if not render:
+            return None
+        tile = self.tiles[key] = self.render_tile(level, tx, ty)
+        if len(self.tiles) > self.cache_size:
+            self.tiles.popitem(last=False)
+        return tile
+
+    # A stand-in for a tile that isn't drawn yet: the part of the closest
+    # cached lower level tile that covers it, scaled up. None if there is none.
+    def get_placeholder(self, level, tx, ty):
+        for up in range(1, level + 1):
+            part = self.tile_size >> up
+            if part < 1:
+                break
+            parent = self.tiles.get((level - up, tx >> up, ty >> up))
+            if parent is not None:
+                mask = (1 << up) - 1
+                area = pygame.Rect((tx & mask) * part, (ty & mask) * part, part, part)
+                return pygame.transform.scale(parent.subsurface(area), (self.tile_size, self.tile_size))
+        return None
+
+    def render_tile(self, level, tx, ty):
+        self.rendered += 1
+        scale = self.get_scale(level)
+        size = self.tile_size
+        left, top = tx * size, ty * size
+        tile = pygame.Surface((size, size))
+        tile.fill(BACKGROUND)
+
+        # Grid, with a finer one once there is room for it
+        grids = [(GRID_UNITS, GRID_COLOR)]
+        if MINOR_GRID_UNITS * scale >= MINOR_GRID_MIN:
+            grids.insert(0, (MINOR_GRID_UNITS, MINOR_GRID_COLOR))
+        for units, color in grids:
+            step = units * scale
+            for x in range(math.ceil(left / step) * step, left + size, step):
+                pygame.draw.line(tile, color, (x - left, 0), (x - left, size - 1))
+            for y in range(math.ceil(top / step) * step, top + size, step):
+                pygame.draw.line(tile, color, (0, y - top), (size - 1, y - top))
+
+        # The trail, with round joints so thick lines don't gap at the corners.
+        # Drawing clips to the tile, so every tile draws the whole line.
+        width = trail_width(level)
+        points = [(round(x * scale) - left, round(y * scale) - top) for x, y in self.points]
+        pygame.draw.lines(tile, TRAIL_COLOR, False, points, width)
+        for point in points:
+            pygame.draw.circle(tile, TRAIL_COLOR, point, width // 2)
+
+        # Markers, then the labels that reach into this tile
+        for point in points:
+            pygame.draw.circle(tile, MARKER_COLOR, point, marker_radius(level))
+        bounds = pygame.Rect(left, top, size, size)
+        for text, rect in self.get_labels(level):
+            if rect.colliderect(bounds):
+                tile.blit(text, (rect.x - left, rect.y - top))
+        return tile
+
+    # Tiles of a level that overlap view (a rect in level pixels), as
+    # (tx, ty, x, y) with x, y the tile's position relative to the view
+    def get_visible_tiles(self, level, view):
+        width, height = self.get_level_size(level)
+        size = self.tile_size
+        first_x, first_y = max(0, view.left // size), max(0, view.top // size)
+        last_x = min(math.ceil(width / size), math.ceil(view.right / size))
+        last_y = min(math.ceil(height / size), math.ceil(view.bottom / size))
+        return [(tx, ty, tx * size - view.left, ty * size - view.top)
+                for ty in range(first_y, last_y) for tx in range(first_x, last_x)]